@@ -1,9 +1,13 @@
 import streamlit as st
-import os
+import io
+import librosa
 import numpy as np
 import pandas as pd
-import tempfile
+import hashlib
+import heapq
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 import audio_processing
 import emotion_analysis
@@ -11,6 +15,11 @@ import visualization
 import utils
 import transcription
 
+# Ограничения кэшей по загруженным файлам: декодированное аудио и каналы занимают
+# десятки мегабайт на запись, поэтому храним только несколько последних файлов и недолго
+AUDIO_CACHE_MAX_ENTRIES = 4
+AUDIO_CACHE_TTL = 60 * 60  # 1 час
+
 # Настройка конфигурации страницы
 st.set_page_config(
     page_title="Система мониторинга качества колл-центра",
@@ -25,8 +34,138 @@ if 'current_file' not in st.session_state:
     st.session_state.current_file = None
 if 'analysis_results' not in st.session_state:
     st.session_state.analysis_results = {}
-if 'transcriber' not in st.session_state:
-    st.session_state.transcriber = transcription.Transcriber()
+if 'viz_cache' not in st.session_state:
+    st.session_state.viz_cache = {}
+
+@st.cache_resource
+def get_emotion_analyzer():
+    """
+    Возвращает единственный на процесс экземпляр анализатора эмоций.
+    """
+    return emotion_analysis.EmotionAnalyzer()
+
+@st.cache_resource
+def get_transcriber():
+    """
+    Возвращает единственный на процесс экземпляр транскрайбера.
+    """
+    return transcription.Transcriber()
+
+class UncachedResult(Exception):
+    """
+    Результат, полученный при временном сбое (сеть, API, модель). Кэшируемая функция
+    выбрасывает его вместо возврата, поэтому st.cache_data ничего не сохраняет
+    и повторная обработка того же файла снова выполнит запрос.
+    """
+    def __init__(self, result):
+        super().__init__()
+        self.result = result
+
+def call_uncached_on_failure(cached_func, *args):
+    """
+    Вызывает кэшируемую функцию и возвращает ее результат, в том числе результат сбоя.
+    
+    Args:
+        cached_func (Callable): Функция под st.cache_data
+        *args: Аргументы функции
+        
+    Returns:
+        Any: Результат функции
+    """
+    try:
+        return cached_func(*args)
+    except UncachedResult as e:
+        return e.result
+
+@st.cache_data(show_spinner=False, max_entries=AUDIO_CACHE_MAX_ENTRIES, ttl=AUDIO_CACHE_TTL)
+def decode_audio(file_hash, _file_bytes):
+    """
+    Декодирует загруженный файл один раз. Результат кэшируется по хэшу файла.
+    
+    Args:
+        file_hash (str): SHA-1 содержимого файла (ключ кэша)
+        _file_bytes (bytes): Содержимое файла (не участвует в ключе кэша)
+        
+    Returns:
+        tuple: (аудио, частота_дискретизации), аудио в исходном числе каналов
+    """
+    try:
+        return librosa.load(io.BytesIO(_file_bytes), sr=None, mono=False)
+    except Exception:
+        # Формат не читается libsndfile, а audioread не работает с файлами в памяти:
+        # декодируем через pydub (ffmpeg)
+        return audio_processing.load_with_pydub(io.BytesIO(_file_bytes))
+
+@st.cache_data(show_spinner=False, max_entries=AUDIO_CACHE_MAX_ENTRIES, ttl=AUDIO_CACHE_TTL)
+def analyze_audio(file_hash, _file_bytes):
+    """
+    Разделяет каналы и анализирует эмоции. Результат кэшируется по хэшу файла.
+    
+    Args:
+        file_hash (str): SHA-1 содержимого файла (ключ кэша)
+        _file_bytes (bytes): Содержимое файла (не участвует в ключе кэша)
+        
+    Returns:
+        dict: Аудио каналов, частота дискретизации и эмоции
+        
+    Raises:
+        UncachedResult: Если распознать эмоции не удалось; result содержит нейтральные эмоции
+    """
+    audio, sample_rate = decode_audio(file_hash, _file_bytes)
+    operator_audio, customer_audio, sample_rate = audio_processing.separate_channels_from_array(audio, sample_rate)
+    
+    audios = [operator_audio, customer_audio]
+    try:
+        operator_emotions, customer_emotions = get_emotion_analyzer().recognize_emotions_batch(audios, sample_rate)
+        failed = False
+    except Exception as e:
+        print(f"Ошибка при анализе эмоций: {str(e)}")
+        operator_emotions, customer_emotions = emotion_analysis.neutral_emotions(audios, sample_rate)
+        failed = True
+    
+    result = {
+        "operator_audio": operator_audio,
+        "customer_audio": customer_audio,
+        "sample_rate": sample_rate,
+        "operator_emotions": operator_emotions,
+        "customer_emotions": customer_emotions
+    }
+    if failed:
+        raise UncachedResult(result)
+    return result
+
+@st.cache_data(show_spinner=False, max_entries=AUDIO_CACHE_MAX_ENTRIES, ttl=AUDIO_CACHE_TTL)
+def transcribe_audio(file_hash, _audio_file):
+    """
+    Транскрибирует аудио файл. Результат кэшируется по хэшу файла.
+    
+    Args:
+        file_hash (str): SHA-1 содержимого файла (ключ кэша)
+        _audio_file (BinaryIO): Файловый объект с аудио (не участвует в ключе кэша)
+        
+    Returns:
+        dict: Результаты транскрибации
+        
+    Raises:
+        UncachedResult: Если транскрибация завершилась ошибкой; result содержит ответ с ошибкой
+    """
+    result = get_transcriber().transcribe_audio(_audio_file)
+    if result.get("error"):
+        raise UncachedResult(result)
+    return result
+
+@st.cache_data(show_spinner=False)
+def calculate_call_quality(df):
+    """
+    Рассчитывает оценку качества разговора. Результат кэшируется по содержимому таблицы.
+    
+    Args:
+        df (pd.DataFrame): DataFrame с эмоциями оператора и клиента
+        
+    Returns:
+        float: Оценка качества от 0 до 10
+    """
+    return utils.calculate_call_quality(df)
 
 # Главный заголовок и описание
 st.title("🎧 Система мониторинга качества колл-центра")
@@ -44,43 +183,58 @@ with st.sidebar:
         type=["wav", "mp3"],
         help="Загрузите аудиофайлы записей колл-центра (формат WAV или MP3)"
     )
+    file_hash = hashlib.sha1(uploaded_file.getvalue()).hexdigest() if uploaded_file else None
     
     # Кнопка обработки загруженного файла
     if uploaded_file and st.button("Обработать запись"):
         with st.spinner("Обработка аудиофайла..."):
-            # Сохранение загруженного файла во временное место
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{uploaded_file.name.split('.')[-1]}")
-            temp_file.write(uploaded_file.getvalue())
-            temp_file.close()
+            # Передаем загруженный файл транскрайберу из памяти, без временного файла
+            audio_file = io.BytesIO(uploaded_file.getvalue())
+            audio_file.name = uploaded_file.name
+            
+            # Транскрибация не зависит от анализа эмоций, поэтому запускаем ее в фоне
+            executor = ThreadPoolExecutor(max_workers=1, initializer=add_script_run_ctx,
+                                          initargs=(None, get_script_run_ctx()))
             
             try:
-                # Обработка аудиофайла
-                operator_audio, customer_audio, sample_rate = audio_processing.separate_channels(temp_file.name)
-                
-                # Инициализируем анализатор эмоций
-                emotion_analyzer = emotion_analysis.EmotionAnalyzer()
+                transcription_future = executor.submit(call_uncached_on_failure, transcribe_audio, file_hash, audio_file)
                 
-                # Анализ эмоций
-                operator_emotions = emotion_analyzer.analyze_emotions(operator_audio, sample_rate)
-                customer_emotions = emotion_analyzer.analyze_emotions(customer_audio, sample_rate)
+                # Обработка аудиофайла и анализ эмоций (повторные загрузки берутся из кэша,
+                # после сбоя распознавания анализ повторяется)
+                analysis = call_uncached_on_failure(analyze_audio, file_hash, uploaded_file.getvalue())
+                operator_audio = analysis["operator_audio"]
+                customer_audio = analysis["customer_audio"]
+                sample_rate = analysis["sample_rate"]
+                operator_emotions = analysis["operator_emotions"]
+                customer_emotions = analysis["customer_emotions"]
                 
                 # Генерация временных меток
                 duration = len(operator_audio) / sample_rate
-                timestamps = np.linspace(0, duration, len(operator_emotions))
+                timestamps = np.linspace(0, duration, len(operator_emotions), dtype=np.float32)
+                
+                # DataFrame для детального анализа строится один раз, а не при каждом перезапуске скрипта
+                emotion_dtype = pd.CategoricalDtype(list(utils.EMOTION_CODES))
+                df = pd.DataFrame({
+                    'Время': timestamps,
+                    'Эмоция оператора': pd.Categorical(operator_emotions, dtype=emotion_dtype),
+                    'Эмоция клиента': pd.Categorical(customer_emotions, dtype=emotion_dtype)
+                }, copy=False)
                 
                 # Транскрибация аудио
                 with st.spinner("Транскрибация разговора..."):
                     try:
-                        transcription_result = st.session_state.transcriber.transcribe_audio(temp_file.name)
+                        transcriber = get_transcriber()
+                        transcription_result = transcription_future.result()
                         if transcription_result and "segments" in transcription_result and transcription_result["segments"]:
-                            operator_segments, customer_segments = st.session_state.transcriber.separate_speakers(
+                            operator_segments, customer_segments = transcriber.separate_speakers(
                                 transcription_result["segments"],
                                 operator_audio,
                                 customer_audio,
                                 sample_rate
                             )
-                            transcript = st.session_state.transcriber.format_transcript(
-                                sorted(operator_segments + customer_segments, key=lambda x: x.get("start", 0))
+                            # Сегменты каждого говорящего уже упорядочены по времени - достаточно слияния
+                            transcript = transcriber.format_transcript(
+                                list(heapq.merge(operator_segments, customer_segments, key=lambda x: x.get("start", 0)))
                             )
                             if not transcript or transcript == "Транскрибация недоступна":
                                 st.warning("Не удалось распознать речь в аудиофайле. Возможные причины:\n"
@@ -110,7 +264,10 @@ with st.sidebar:
                     "duration": duration,
                     "operator_emotions": operator_emotions,
                     "customer_emotions": customer_emotions,
+                    "operator_codes": utils.encode_emotions(operator_emotions),
+                    "customer_codes": utils.encode_emotions(customer_emotions),
                     "timestamps": timestamps,
+                    "df": df,
                     "processed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                     "transcript": transcript
                 }
@@ -127,8 +284,8 @@ with st.sidebar:
                 st.error(f"Ошибка при обработке файла: {str(e)}")
             
             finally:
-                # Удаление временного файла
-                os.unlink(temp_file.name)
+                # Дожидаемся окончания транскрибации
+                executor.shutdown(wait=True)
     
     # Отображение списка обработанных файлов
     if st.session_state.processed_files:
@@ -157,7 +314,7 @@ if st.session_state.current_file:
             result["customer_emotions"]
         )
         if emotion_timeline:
-            st.image(f"data:image/png;base64,{emotion_timeline}", use_container_width=True)
+            st.image(emotion_timeline, use_container_width=True)
     
     with tab2:
         st.subheader("Общее распределение эмоций")
@@ -167,37 +324,33 @@ if st.session_state.current_file:
             st.write("Эмоции оператора")
             operator_dist = visualization.create_emotion_distribution(result["operator_emotions"])
             if operator_dist:
-                st.image(f"data:image/png;base64,{operator_dist}", use_container_width=True)
+                st.image(operator_dist, use_container_width=True)
         
         with col2:
             st.write("Эмоции клиента")
             customer_dist = visualization.create_emotion_distribution(result["customer_emotions"])
             if customer_dist:
-                st.image(f"data:image/png;base64,{customer_dist}", use_container_width=True)
+                st.image(customer_dist, use_container_width=True)
     
     with tab3:
         st.subheader("Детальный анализ")
         
-        # Создание DataFrame для детального анализа
-        df = pd.DataFrame({
-            'Время': result["timestamps"],
-            'Эмоция оператора': result["operator_emotions"],
-            'Эмоция клиента': result["customer_emotions"]
-        })
+        # DataFrame для детального анализа
+        df = result["df"]
         
         # Показ интерактивной таблицы
         st.dataframe(df)
         
         # Показ статистики совпадения эмоций
         st.write("#### Совпадение эмоций")
-        emotion_match_rate = (df['Эмоция оператора'] == df['Эмоция клиента']).mean() * 100
+        emotion_match_rate = 100.0 * float(np.mean(result["operator_codes"] == result["customer_codes"]))
         st.metric("Совпадение эмоций", f"{emotion_match_rate:.1f}%", 
                  delta=None)
         
         # Выявление потенциальных проблем
         st.write("#### Потенциальные проблемы")
-        negative_operator = utils.count_emotion_sequences(df['Эмоция оператора'], ['негативные'])
-        negative_customer = utils.count_emotion_sequences(df['Эмоция клиента'], ['негативные'])
+        negative_operator = utils.count_emotion_sequences(df['Эмоция оператора'].to_numpy(), ['негативные'])
+        negative_customer = utils.count_emotion_sequences(df['Эмоция клиента'].to_numpy(), ['негативные'])
         
         if negative_operator > 3:
             st.warning(f"Оператор проявлял негативные эмоции {negative_operator} раз во время разговора")
@@ -206,7 +359,7 @@ if st.session_state.current_file:
             st.warning(f"Клиент проявлял негативные эмоции {negative_customer} раз во время разговора")
         
         # Анализ качества обслуживания
-        quality_score = utils.calculate_call_quality(df)
+        quality_score = calculate_call_quality(df)
         st.write("#### Оценка качества обслуживания")
         st.metric("Общая оценка", f"{quality_score:.1f}/10")
         
@@ -239,31 +392,50 @@ if st.session_state.current_file:
 if uploaded_file is not None:
     st.subheader("Визуализация аудио")
     
-    # Сохраняем загруженный файл во временное место
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{uploaded_file.name.split('.')[-1]}")
-    temp_file.write(uploaded_file.getvalue())
-    temp_file.close()
+    # Графики зависят только от содержимого файла, поэтому при перезапусках скрипта
+    # (переключение вкладок, выбор записи) берем готовые PNG из состояния сессии
+    images = st.session_state.viz_cache.get(file_hash)
+    if images is None:
+        images = (None, None, None)
+        try:
+            # Используем уже декодированное аудио вместо повторной записи и чтения файла
+            audio, sample_rate = decode_audio(file_hash, uploaded_file.getvalue())
+            audio = librosa.to_mono(audio)
+            
+            # Строим три графика параллельно; потокам передаем контекст Streamlit,
+            # чтобы сообщения об ошибках из visualization отображались на странице
+            with ThreadPoolExecutor(max_workers=3, initializer=add_script_run_ctx,
+                                    initargs=(None, get_script_run_ctx())) as executor:
+                futures = [
+                    executor.submit(visualization.plot_linear_waveform, audio, sample_rate),
+                    executor.submit(visualization.plot_waveform, audio, sample_rate),
+                    executor.submit(visualization.plot_spectrogram, audio, sample_rate)
+                ]
+                images = tuple(future.result() for future in futures)
+            
+            # Кэшируем только полностью построенный набор графиков и только для текущего
+            # файла: кэш нужен лишь на перезапуски скрипта, графики прежних загрузок
+            # не должны копиться в памяти сессии
+            if all(images):
+                st.session_state.viz_cache = {file_hash: images}
+        except Exception as e:
+            st.error(f"Ошибка при чтении аудиофайла: {str(e)}")
+    
+    linear_img, waveform_img, spectrogram_img = images
     
-    try:
-        # Линейный график
-        linear_img = visualization.plot_linear_waveform(temp_file.name)
-        if linear_img:
-            st.image(f"data:image/png;base64,{linear_img}", use_container_width=True)
-        
-        # Волновой график и спектрограмма
-        col1, col2 = st.columns(2)
-        with col1:
-            waveform_img = visualization.plot_waveform(temp_file.name)
-            if waveform_img:
-                st.image(f"data:image/png;base64,{waveform_img}", use_container_width=True)
-        
-        with col2:
-            spectrogram_img = visualization.plot_spectrogram(temp_file.name)
-            if spectrogram_img:
-                st.image(f"data:image/png;base64,{spectrogram_img}", use_container_width=True)
-    finally:
-        # Удаляем временный файл
-        os.unlink(temp_file.name)
+    # Линейный график
+    if linear_img:
+        st.image(linear_img, use_container_width=True)
+    
+    # Волновой график и спектрограмма
+    col1, col2 = st.columns(2)
+    with col1:
+        if waveform_img:
+            st.image(waveform_img, use_container_width=True)
+    
+    with col2:
+        if spectrogram_img:
+            st.image(spectrogram_img, use_container_width=True)
 
 else:
     # Отображение инструкций, когда файл не выбран
@@ -273,7 +445,7 @@ else:
     st.subheader("Пример визуализации")
     sample_viz = visualization.create_sample_visualization()
     if sample_viz:
-        st.image(f"data:image/png;base64,{sample_viz}", use_container_width=True)
+        st.image(sample_viz, use_container_width=True)
     
     # Информация о системе
     st.write("""
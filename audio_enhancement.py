@@ -1,10 +1,11 @@
 import numpy as np
-from pydub import AudioSegment
 import librosa
-from scipy import signal
+import soundfile as sf
+from scipy import ndimage, signal
 import logging
 import tempfile
-import os
+from functools import lru_cache
+from typing import Union, BinaryIO
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -17,41 +18,45 @@ class AudioEnhancer:
         """
         self.sample_rate = 16000  # Стандартная частота дискретизации для распознавания речи
         
-    def enhance_audio(self, audio_path: str) -> str:
+        # Коэффициенты фильтров рассчитываются один раз
+        self._denoise_sos = _butter_bandpass_sos(4, 400, 3000, self.sample_rate)  # шумоподавление
+        self._speech_sos = _butter_bandpass_sos(4, 300, 3400, self.sample_rate)  # частоты речи
+        
+    def enhance_audio(self, audio_path: Union[str, BinaryIO]) -> Union[str, BinaryIO]:
         """
         Основная функция улучшения качества аудио
         
         Args:
-            audio_path (str): Путь к исходному аудио файлу
+            audio_path (Union[str, BinaryIO]): Путь к исходному аудио файлу или файловый объект
             
         Returns:
-            str: Путь к улучшенному аудио файлу
+            Union[str, BinaryIO]: Путь к улучшенному аудио файлу (при ошибке - исходный audio_path)
         """
         try:
             logger.info(f"Начало улучшения аудио: {audio_path}")
             
-            # Загружаем аудио
-            audio = AudioSegment.from_file(audio_path)
-            logger.info(f"Исходная длительность: {len(audio)/1000:.2f} сек")
+            # Загружаем аудио один раз: моно, float32, сразу в целевой частоте дискретизации.
+            # Понижение частоты до фильтрации сокращает объем работы всех последующих этапов
+            audio, _ = librosa.load(audio_path, sr=self.sample_rate, mono=True,
+                                    dtype=np.float32, res_type='soxr_hq')
+            logger.info(f"Исходная длительность: {len(audio)/self.sample_rate:.2f} сек")
             
-            # Применяем последовательность улучшений
+            # Применяем последовательность улучшений над одним массивом numpy
             audio = self._normalize_audio(audio)
             audio = self._remove_background_noise(audio)
             audio = self._enhance_speech(audio)
             audio = self._apply_compression(audio)
             
+            # Небольшое усиление (бывший фильтр ffmpeg volume=1.5) на месте
+            audio *= np.float32(1.5)
+            np.clip(audio, -1.0, 1.0, out=audio)
+            
             # Создаем временный файл для результата
             temp_wav = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
             temp_wav.close()
             
-            # Экспортируем с оптимальными параметрами
-            audio.export(temp_wav.name, format="wav", parameters=[
-                "-ac", "1",  # моно
-                "-ar", str(self.sample_rate),  # частота дискретизации
-                "-acodec", "pcm_s16le",  # кодек
-                "-sample_fmt", "s16",  # формат сэмпла
-                "-af", "volume=1.5"  # небольшое усиление
-            ])
+            # Экспортируем в моно PCM 16 бит напрямую через libsndfile, без запуска ffmpeg
+            sf.write(temp_wav.name, audio, self.sample_rate, subtype='PCM_16')
             
             logger.info(f"Аудио успешно улучшено и сохранено в: {temp_wav.name}")
             return temp_wav.name
@@ -60,155 +65,176 @@ class AudioEnhancer:
             logger.error(f"Ошибка при улучшении аудио: {str(e)}")
             return audio_path
             
-    def _normalize_audio(self, audio: AudioSegment) -> AudioSegment:
+    def _normalize_audio(self, audio: np.ndarray) -> np.ndarray:
         """
         Нормализация громкости и базовое улучшение
         
         Args:
-            audio (AudioSegment): Исходное аудио
+            audio (np.ndarray): Исходное аудио
             
         Returns:
-            AudioSegment: Нормализованное аудио
+            np.ndarray: Нормализованное аудио
         """
         try:
             logger.info("Нормализация аудио")
             
             # Проверяем исходные параметры
-            original_samples = np.array(audio.get_array_of_samples())
-            original_avg = np.mean(np.abs(original_samples))
-            original_max = np.max(np.abs(original_samples))
-            logger.info(f"Исходные параметры - Средняя амплитуда: {original_avg:.2f}, Максимальная: {original_max}")
+            _log_levels("Исходные параметры", audio)
             
-            # Нормализация громкости
-            audio = audio.normalize()
+            # Нормализация громкости (все шаги выполняются на месте, без новых массивов)
+            audio = _peak_normalize(audio)
             
             # Усиление тихих частей
-            audio = audio + 30  # Увеличиваем громкость на 30 дБ
+            audio *= np.float32(_db_to_gain(30))  # Увеличиваем громкость на 30 дБ
+            np.clip(audio, -1.0, 1.0, out=audio)
             
             # Применяем компрессор для выравнивания динамического диапазона
-            audio = audio.compress_dynamic_range()
+            audio = compress_dynamic_range(audio, self.sample_rate)
             
             # Проверяем результат
-            processed_samples = np.array(audio.get_array_of_samples())
-            processed_avg = np.mean(np.abs(processed_samples))
-            processed_max = np.max(np.abs(processed_samples))
-            logger.info(f"После нормализации - Средняя амплитуда: {processed_avg:.2f}, Максимальная: {processed_max}")
+            _log_levels("После нормализации", audio)
             
             return audio
         except Exception as e:
             logger.error(f"Ошибка при нормализации: {str(e)}")
             return audio
             
-    def _remove_background_noise(self, audio: AudioSegment) -> AudioSegment:
+    def _remove_background_noise(self, audio: np.ndarray) -> np.ndarray:
         """
         Удаление фонового шума
         
         Args:
-            audio (AudioSegment): Исходное аудио
+            audio (np.ndarray): Исходное аудио
             
         Returns:
-            AudioSegment: Очищенное аудио
+            np.ndarray: Очищенное аудио
         """
         try:
             logger.info("Удаление фонового шума")
             
-            # Конвертируем в numpy массив
-            samples = np.array(audio.get_array_of_samples())
-            
-            # Применяем фильтр высоких частот для удаления низкочастотных шумов
-            nyquist = audio.frame_rate / 2
-            high_pass = 400  # Увеличиваем частоту среза для низких частот
-            b, a = signal.butter(4, high_pass/nyquist, btype='high')
-            filtered = signal.filtfilt(b, a, samples)
-            
-            # Применяем фильтр низких частот для удаления высокочастотных шумов
-            low_pass = 3000  # Частота среза для высоких частот
-            b, a = signal.butter(4, low_pass/nyquist, btype='low')
-            filtered = signal.filtfilt(b, a, filtered)
+            # Полосовой фильтр заменяет пару фильтров высоких (400 Гц) и низких (3000 Гц) частот
+            filtered = signal.sosfiltfilt(self._denoise_sos, audio)
             
-            # Применяем шумоподавление с более агрессивными параметрами
-            noise_reduced = librosa.effects.preemphasis(filtered, coef=0.97)
+            # Применяем предыскажение на месте
+            filtered[1:] -= np.float32(0.97) * filtered[:-1]
             
-            # Конвертируем обратно в AudioSegment
-            cleaned_audio = AudioSegment(
-                noise_reduced.tobytes(),
-                frame_rate=audio.frame_rate,
-                sample_width=audio.sample_width,
-                channels=audio.channels
-            )
-            
-            return cleaned_audio
+            return filtered
         except Exception as e:
             logger.error(f"Ошибка при удалении шума: {str(e)}")
             return audio
             
-    def _enhance_speech(self, audio: AudioSegment) -> AudioSegment:
+    def _enhance_speech(self, audio: np.ndarray) -> np.ndarray:
         """
         Улучшение качества речи
         
         Args:
-            audio (AudioSegment): Исходное аудио
+            audio (np.ndarray): Исходное аудио
             
         Returns:
-            AudioSegment: Улучшенное аудио
+            np.ndarray: Улучшенное аудио
         """
         try:
             logger.info("Улучшение качества речи")
             
-            # Конвертируем в numpy массив
-            samples = np.array(audio.get_array_of_samples())
-            
-            # Применяем эквалайзер для усиления частот речи
-            nyquist = audio.frame_rate / 2
-            
-            # Усиливаем частоты речи (300-3400 Гц)
-            speech_low = 300 / nyquist
-            speech_high = 3400 / nyquist
-            b, a = signal.butter(4, [speech_low, speech_high], btype='band')
-            enhanced = signal.filtfilt(b, a, samples)
-            
-            # Применяем предыскажение для улучшения разборчивости
-            enhanced = librosa.effects.preemphasis(enhanced, coef=0.97)
+            # Применяем эквалайзер для усиления частот речи (300-3400 Гц)
+            enhanced = signal.sosfiltfilt(self._speech_sos, audio)
             
-            # Конвертируем обратно в AudioSegment
-            enhanced_audio = AudioSegment(
-                enhanced.tobytes(),
-                frame_rate=audio.frame_rate,
-                sample_width=audio.sample_width,
-                channels=audio.channels
-            )
+            # Применяем предыскажение на месте для улучшения разборчивости
+            enhanced[1:] -= np.float32(0.97) * enhanced[:-1]
             
-            return enhanced_audio
+            return enhanced
         except Exception as e:
             logger.error(f"Ошибка при улучшении речи: {str(e)}")
             return audio
             
-    def _apply_compression(self, audio: AudioSegment) -> AudioSegment:
+    def _apply_compression(self, audio: np.ndarray) -> np.ndarray:
         """
         Применение компрессии для выравнивания громкости
         
         Args:
-            audio (AudioSegment): Исходное аудио
+            audio (np.ndarray): Исходное аудио
             
         Returns:
-            AudioSegment: Сжатое аудио
+            np.ndarray: Сжатое аудио
         """
         try:
             logger.info("Применение компрессии")
             
             # Применяем компрессор для выравнивания динамического диапазона
-            audio = audio.compress_dynamic_range()
+            audio = compress_dynamic_range(audio, self.sample_rate)
             
             # Дополнительное выравнивание громкости
-            audio = audio.normalize()
+            audio = _peak_normalize(audio)
             
             # Проверяем результат
-            processed_samples = np.array(audio.get_array_of_samples())
-            processed_avg = np.mean(np.abs(processed_samples))
-            processed_max = np.max(np.abs(processed_samples))
-            logger.info(f"После компрессии - Средняя амплитуда: {processed_avg:.2f}, Максимальная: {processed_max}")
+            _log_levels("После компрессии", audio)
             
             return audio
         except Exception as e:
             logger.error(f"Ошибка при компрессии: {str(e)}")
-            return audio 
\ No newline at end of file
+            return audio
+
+
+def compress_dynamic_range(audio: np.ndarray, sample_rate: int, threshold: float = -20.0,
+                           ratio: float = 4.0, window: float = 0.005) -> np.ndarray:
+    """
+    Компрессор динамического диапазона (аналог AudioSegment.compress_dynamic_range)
+    
+    Args:
+        audio (np.ndarray): Исходное аудио
+        sample_rate (int): Частота дискретизации
+        threshold (float): Порог срабатывания в дБFS
+        ratio (float): Степень сжатия сигнала выше порога
+        window (float): Окно сглаживания огибающей в секундах
+        
+    Returns:
+        np.ndarray: Сжатое аудио (тот же массив, измененный на месте)
+    """
+    # Огибающая по скользящему среднеквадратичному значению; один рабочий буфер на все шаги
+    size = max(1, int(sample_rate * window))
+    gain = np.square(audio)
+    ndimage.uniform_filter1d(gain, size=size, output=gain)
+    np.sqrt(gain, out=gain)
+    
+    # Ослабляем части сигнала выше порога в ratio раз (в логарифмической шкале);
+    # ниже порога отношение ограничено единицей, и коэффициент усиления равен 1
+    gain *= np.float32(1.0 / _db_to_gain(threshold))
+    np.maximum(gain, 1.0, out=gain)
+    np.power(gain, 1.0 / ratio - 1.0, out=gain)
+    
+    audio *= gain
+    return audio
+
+@lru_cache(maxsize=8)
+def _butter_bandpass_sos(order: int, low: float, high: float, sample_rate: int) -> np.ndarray:
+    """
+    Рассчитывает коэффициенты полосового фильтра Баттерворта в форме SOS (с кэшированием).
+    Коэффициенты хранятся в float32, чтобы фильтрация float32 сигнала не переходила в float64.
+    """
+    nyquist = sample_rate / 2
+    sos = signal.butter(order, [low / nyquist, high / nyquist], btype='band', output='sos')
+    return sos.astype(np.float32)
+
+def _db_to_gain(db: float) -> float:
+    """
+    Переводит значение в децибелах в линейный коэффициент усиления
+    """
+    return 10 ** (db / 20)
+
+def _peak_normalize(audio: np.ndarray) -> np.ndarray:
+    """
+    Нормализует аудио к пиковой амплитуде 1 (на месте)
+    """
+    peak = max(audio.max(), -audio.min()) if audio.size else 0
+    if peak > 0:
+        audio *= np.float32(1.0 / peak)
+    return audio
+
+def _log_levels(stage: str, audio: np.ndarray) -> None:
+    """
+    Пишет в лог среднюю и максимальную амплитуду. Статистика считается только
+    при включенном уровне DEBUG, чтобы не делать лишних проходов по массиву.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        magnitude = np.abs(audio)
+        logger.debug(f"{stage} - Средняя амплитуда: {magnitude.mean():.4f}, Максимальная: {magnitude.max():.4f}")
@@ -1,9 +1,20 @@
 import librosa
 import numpy as np
 import soundfile as sf
-from scipy.signal import butter, lfilter
+from scipy.signal import butter, sosfilt
 import pydub
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from numba import njit
+from threadpoolctl import threadpool_limits
+
+# Пределы для отчета о качестве: более длинные записи и более высокие частоты не загружаются целиком
+MAX_AUDIO_DURATION = 3 * 60 * 60  # 3 часа
+MAX_SAMPLE_RATE = 96000
+
+# Поддерживаемые расширения аудио файлов
+_VALID_EXTENSIONS = frozenset({'.wav', '.mp3', '.ogg', '.flac', '.m4a'})
 
 def separate_channels(audio_path):
     """
@@ -18,17 +29,8 @@ def separate_channels(audio_path):
     """
     try:
         # Загрузка аудио файла
-        audio, sample_rate = librosa.load(audio_path, sr=None, mono=False)
-        
-        # Проверка, является ли аудио стерео (имеет 2 канала)
-        if isinstance(audio, np.ndarray) and audio.ndim > 1 and audio.shape[0] == 2:
-            # Стерео файл - используем каналы напрямую
-            operator_audio = audio[0]
-            customer_audio = audio[1]
-            return operator_audio, customer_audio, sample_rate
-        else:
-            # Моно файл - используем технику разделения голосов
-            return separate_speakers_from_mono(audio, sample_rate)
+        audio, sample_rate = _load_audio(audio_path, mono=False)
+        return separate_channels_from_array(audio, sample_rate)
             
     except Exception as e:
         # Обработка проблем с форматом
@@ -38,6 +40,51 @@ def separate_channels(audio_path):
         else:
             raise Exception(f"Ошибка обработки аудио файла: {str(e)}")
 
+def _load_audio(audio_path, mono=True):
+    """
+    Загружает аудио файл без передискретизации.
+    Сначала пробует прочитать файл напрямую через soundfile (WAV, FLAC, OGG),
+    при неудаче использует librosa.
+    
+    Args:
+        audio_path (str): Путь к аудио файлу
+        mono (bool): Свести каналы в моно
+        
+    Returns:
+        tuple: (аудио, частота_дискретизации), аудио формы (каналы, отсчеты) или одномерное для моно
+    """
+    try:
+        samples, sample_rate = sf.read(audio_path, dtype='float32', always_2d=True)
+    except RuntimeError:
+        return librosa.load(audio_path, sr=None, mono=mono)
+    
+    if mono:
+        return np.mean(samples, axis=1), sample_rate
+    if samples.shape[1] == 1:
+        return samples[:, 0], sample_rate
+    return np.ascontiguousarray(samples.T), sample_rate
+
+def separate_channels_from_array(audio, sample_rate):
+    """
+    Разделение уже декодированного аудио на каналы оператора и клиента.
+    
+    Args:
+        audio (numpy.ndarray): Аудио сигнал формы (каналы, отсчеты) или моно
+        sample_rate (int): Частота дискретизации аудио
+        
+    Returns:
+        tuple: (аудио_оператора, аудио_клиента, частота_дискретизации)
+    """
+    # Проверка, является ли аудио стерео (имеет 2 канала)
+    if isinstance(audio, np.ndarray) and audio.ndim > 1 and audio.shape[0] == 2:
+        # Стерео файл - используем каналы напрямую
+        operator_audio = audio[0]
+        customer_audio = audio[1]
+        return operator_audio, customer_audio, sample_rate
+    else:
+        # Моно файл - используем технику разделения голосов
+        return separate_speakers_from_mono(audio, sample_rate)
+
 def separate_speakers_from_mono(audio, sample_rate):
     """
     Разделение говорящих из моно записи с использованием временного анализа.
@@ -55,8 +102,8 @@ def separate_speakers_from_mono(audio, sample_rate):
         if audio.ndim > 1:
             audio = np.mean(audio, axis=0)
         
-        # Нормализуем входной сигнал
-        audio = normalize_audio(audio)
+        # Входной сигнал не нормализуем: порог по процентилю не зависит от масштаба,
+        # а результаты нормализуются в конце
         
         # Разбиваем сигнал на короткие сегменты
         frame_length = int(sample_rate * 0.025)  # 25 мс
@@ -66,53 +113,19 @@ def separate_speakers_from_mono(audio, sample_rate):
         frames = librosa.util.frame(audio, frame_length=frame_length, hop_length=hop_length)
         energy = np.sum(frames ** 2, axis=0)
         
-        # Нормализуем энергию
-        energy = (energy - np.min(energy)) / (np.max(energy) - np.min(energy))
+        # Определяем порог для разделения по процентилю, а не по среднему
+        threshold = np.percentile(energy, 60)
         
-        # Создаём маски для оператора и клиента
+        # Создаём маски на основе энергии: высокая энергия - вероятно оператор, низкая - вероятно клиент
         operator_mask = np.zeros_like(audio)
         customer_mask = np.zeros_like(audio)
-        
-        # Определяем порог для разделения
-        threshold = np.mean(energy) * 1.2
-        
-        # Создаём маски на основе энергии
-        for i in range(len(energy)):
-            start = i * hop_length
-            end = min(start + frame_length, len(audio))
-            
-            if energy[i] > threshold:
-                # Высокая энергия - вероятно оператор
-                operator_mask[start:end] = 0.8
-                customer_mask[start:end] = 0.2
-            else:
-                # Низкая энергия - вероятно клиент
-                operator_mask[start:end] = 0.2
-                customer_mask[start:end] = 0.8
-        
-        # Применяем плавные переходы между сегментами
         transition_length = int(sample_rate * 0.005)  # 5 мс
-        for i in range(1, len(energy)):
-            start = i * hop_length
-            end = min(start + transition_length, len(audio))
-            
-            # Плавный переход для оператора
-            operator_mask[start:end] = np.linspace(
-                operator_mask[start-1],
-                operator_mask[start],
-                end - start
-            )
-            
-            # Плавный переход для клиента
-            customer_mask[start:end] = np.linspace(
-                customer_mask[start-1],
-                customer_mask[start],
-                end - start
-            )
+        _fill_masks(energy, threshold, hop_length, frame_length, transition_length,
+                    operator_mask, customer_mask)
         
-        # Применяем маски
-        operator_audio = audio * operator_mask
-        customer_audio = audio * customer_mask
+        # Применяем маски (результат записываем в буферы масок)
+        operator_audio = np.multiply(audio, operator_mask, out=operator_mask)
+        customer_audio = np.multiply(audio, customer_mask, out=customer_mask)
         
         # Нормализуем результаты
         operator_audio = normalize_audio(operator_audio)
@@ -125,6 +138,76 @@ def separate_speakers_from_mono(audio, sample_rate):
         # Возвращаем исходное аудио для обоих каналов при неудаче разделения
         return audio, audio, sample_rate
 
+@njit(cache=True, boundscheck=False)
+def _fill_masks(energy, threshold, hop_length, frame_length, transition_length, operator_mask, customer_mask):
+    """
+    Заполняет маски оператора и клиента по энергии сегментов за один проход.
+    
+    Сегменты перекрываются, поэтому каждый отсчёт получает значение последнего покрывающего его сегмента;
+    отсчёты после конца последнего сегмента остаются нулевыми. На границах, где значение меняется,
+    делается плавный линейный переход длиной transition_length (не больше hop_length).
+    
+    Args:
+        energy (numpy.ndarray): Энергия сегментов
+        threshold (float): Порог энергии
+        hop_length (int): Шаг между сегментами
+        frame_length (int): Длина сегмента
+        transition_length (int): Длина плавного перехода
+        operator_mask (numpy.ndarray): Выходная маска оператора (заполнена нулями)
+        customer_mask (numpy.ndarray): Выходная маска клиента (заполнена нулями)
+    """
+    n = operator_mask.shape[0]
+    n_frames = energy.shape[0]
+    
+    for i in range(n_frames):
+        start = i * hop_length
+        if i == n_frames - 1:
+            end = min(start + frame_length, n)
+        else:
+            end = min(start + hop_length, n)
+        
+        if energy[i] > threshold:
+            operator_value, customer_value = 0.8, 0.2
+        else:
+            operator_value, customer_value = 0.2, 0.8
+        
+        for j in range(start, end):
+            operator_mask[j] = operator_value
+            customer_mask[j] = customer_value
+    
+    for i in range(1, n_frames):
+        # Переход нужен только там, где сегменты попали по разные стороны порога
+        if (energy[i] > threshold) == (energy[i - 1] > threshold):
+            continue
+        
+        start = i * hop_length
+        end = min(start + transition_length, n)
+        operator_from = operator_mask[start - 1]
+        operator_to = operator_mask[start]
+        customer_from = customer_mask[start - 1]
+        customer_to = customer_mask[start]
+        
+        steps = end - start - 1
+        for j in range(start, end):
+            t = (j - start) / steps if steps > 0 else 0.0
+            operator_mask[j] = operator_from + (operator_to - operator_from) * t
+            customer_mask[j] = customer_from + (customer_to - customer_from) * t
+
+@lru_cache(maxsize=16)
+def _butter_bandpass_sos(order, low, high):
+    """
+    Рассчитывает коэффициенты полосового фильтра Баттерворта в форме SOS (с кэшированием)
+    
+    Args:
+        order (int): Порядок фильтра
+        low (float): Нижняя нормализованная частота среза
+        high (float): Верхняя нормализованная частота среза
+        
+    Returns:
+        numpy.ndarray: Коэффициенты фильтра в форме SOS
+    """
+    return butter(order, [low, high], btype='band', output='sos')
+
 def bandpass_filter(data, lowcut, highcut, sample_rate, order=4):
     """
     Применяет полосовой фильтр к аудио сигналу с улучшенными проверками безопасности
@@ -163,13 +246,12 @@ def bandpass_filter(data, lowcut, highcut, sample_rate, order=4):
             low = mid - 0.005
             high = mid + 0.005
         
-        # Применяем фильтр с уменьшенным порядком для стабильности
-        b, a = butter(order, [low, high], btype='band')
-        filtered = lfilter(b, a, data)
+        # Применяем фильтр с уменьшенным порядком в форме SOS (устойчивее, чем коэффициенты b, a)
+        sos = _butter_bandpass_sos(order, round(low, 6), round(high, 6))
+        filtered = sosfilt(sos, data)
         
         # Нормализуем отфильтрованный сигнал
-        if np.max(np.abs(filtered)) > 0:
-            filtered = filtered / np.max(np.abs(filtered))
+        filtered = normalize_audio(filtered)
         
         return filtered
         
@@ -187,10 +269,44 @@ def normalize_audio(audio):
     Returns:
         numpy.ndarray: Нормализованный аудио сигнал
     """
-    if np.max(np.abs(audio)) > 0:
-        return audio / np.max(np.abs(audio))
+    # Пик за два прохода без временного массива np.abs
+    peak = max(np.max(audio), -np.min(audio)) if audio.size else 0
+    if peak > 0 and peak != 1:
+        return audio / peak
     return audio
 
+# Типы отсчетов pydub по ширине отсчета в байтах
+_PYDUB_SAMPLE_TYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+def load_with_pydub(audio_file):
+    """
+    Загружает аудио через pydub (ffmpeg) для форматов, которые не читает soundfile.
+    
+    Args:
+        audio_file (str или file-like): Путь к аудио файлу или файловый объект в памяти
+        
+    Returns:
+        tuple: (аудио, частота_дискретизации), аудио формы (каналы, отсчеты) или одномерное для моно
+    """
+    # Загружаем аудио с помощью pydub
+    audio = pydub.AudioSegment.from_file(audio_file)
+    
+    # Преобразуем в массив numpy без копирования (представление поверх байтов pydub)
+    sample_type = _PYDUB_SAMPLE_TYPES.get(audio.sample_width)
+    if sample_type is not None:
+        samples = np.frombuffer(audio.raw_data, dtype=sample_type)
+    else:
+        samples = np.array(audio.get_array_of_samples())
+    
+    # Нормализуем целочисленные отсчеты в диапазон [-1, 1]
+    scale = np.float32(1.0 / (1 << (8 * audio.sample_width - 1)))
+    samples = samples.astype(np.float32) * scale
+    
+    # Отсчеты pydub чередуются по каналам
+    if audio.channels > 1:
+        samples = np.ascontiguousarray(samples.reshape((-1, audio.channels)).T)
+    return samples, audio.frame_rate
+
 def process_with_pydub(audio_path):
     """
     Обработка аудио с использованием pydub для большей совместимости форматов
@@ -201,27 +317,16 @@ def process_with_pydub(audio_path):
     Returns:
         tuple: (аудио_оператора, аудио_клиента, частота_дискретизации)
     """
-    # Загружаем аудио с помощью pydub
-    audio = pydub.AudioSegment.from_file(audio_path)
-    
-    # Получаем частоту дискретизации
-    sample_rate = audio.frame_rate
-    
-    # Преобразуем в массив numpy
-    samples = np.array(audio.get_array_of_samples())
+    audio, sample_rate = load_with_pydub(audio_path)
     
     # Проверяем, является ли стерео
-    if audio.channels == 2:
-        # Изменяем форму для стерео
-        samples = samples.reshape((-1, 2))
-        operator_audio = samples[:, 0].astype(np.float32) / 32768.0  # Нормализация
-        customer_audio = samples[:, 1].astype(np.float32) / 32768.0  # Нормализация
-    else:
-        # Если моно, разделяем с помощью другой функции
-        samples = samples.astype(np.float32) / 32768.0  # Нормализация
-        return separate_speakers_from_mono(samples, sample_rate)
+    if audio.ndim == 2 and audio.shape[0] == 2:
+        return audio[0], audio[1], sample_rate
     
-    return operator_audio, customer_audio, sample_rate
+    # Если моно, разделяем с помощью другой функции
+    if audio.ndim == 2:
+        audio = np.mean(audio, axis=0)
+    return separate_speakers_from_mono(audio, sample_rate)
 
 def resample_audio(audio, orig_sr, target_sr):
     """
@@ -266,18 +371,25 @@ def analyze_and_enhance_audio(audio, sample_rate):
         # Проверка на тихий звук
         if mean_rms < 0.01:  # Пороговое значение для тихого звука
             analysis_results['is_too_quiet'] = True
-            # Усиление тихого звука
-            audio = audio * 5.0  # Увеличиваем громкость в 5 раз
+            # Отдельное усиление тихого звука не нужно: фильтр линейный,
+            # а после него сигнал всё равно нормализуется к пику 1
         
         # Применяем полосовой фильтр для улучшения разборчивости речи
         # Диапазон частот человеческой речи: 85-255 Гц
         audio = bandpass_filter(audio, 85, 255, sample_rate)
         
-        # Нормализация после обработки
+        # Нормализация после обработки (bandpass_filter уже нормализует результат,
+        # normalize_audio в этом случае возвращает сигнал без лишнего прохода)
         audio = normalize_audio(audio)
         
+        # Один спектр обработанного сигнала для RMS и спектральной центроиды
+        n_fft = 2048
+        stft_mag = np.abs(librosa.stft(audio, n_fft=n_fft, hop_length=512))
+        
         # Проверяем результат после обработки
-        enhanced_rms = np.mean(librosa.feature.rms(y=audio)[0])
+        # rms по спектру занижен на мощность окна Ханна, компенсируем её
+        window_power = np.mean(librosa.filters.get_window('hann', n_fft) ** 2)
+        enhanced_rms = np.mean(librosa.feature.rms(S=stft_mag, frame_length=n_fft)[0]) / np.sqrt(window_power)
         analysis_results['enhanced_rms'] = enhanced_rms
         
         # Определяем наличие речи после обработки
@@ -286,8 +398,7 @@ def analyze_and_enhance_audio(audio, sample_rate):
         
         # Проверка на неразборчивость
         # Используем спектральную центроиду как индикатор четкости
-        # Исправляем параметры для spectral_centroid
-        spectral_centroid = librosa.feature.spectral_centroid(y=audio, sr=sample_rate, n_fft=2048, hop_length=512)[0]
+        spectral_centroid = librosa.feature.spectral_centroid(S=stft_mag, sr=sample_rate, n_fft=n_fft, hop_length=512)[0]
         if np.std(spectral_centroid) < 500:  # Низкая вариация может указывать на неразборчивость
             analysis_results['is_unclear'] = True
         
@@ -316,15 +427,33 @@ def get_audio_quality_report(audio_path):
             }
             
         # Проверка расширения файла
-        valid_extensions = ['.wav', '.mp3', '.ogg', '.flac', '.m4a']
-        if not any(audio_path.lower().endswith(ext) for ext in valid_extensions):
+        if os.path.splitext(audio_path)[1].lower() not in _VALID_EXTENSIONS:
             return {
                 'error': f"Неподдерживаемый формат файла: {audio_path}",
-                'recommendations': [f"Поддерживаемые форматы: {', '.join(valid_extensions)}"]
+                'recommendations': [f"Поддерживаемые форматы: {', '.join(sorted(_VALID_EXTENSIONS))}"]
             }
         
+        # Проверяем параметры по заголовку файла, не декодируя его целиком
+        try:
+            info = sf.info(audio_path)
+        except RuntimeError:
+            # Формат не поддерживается soundfile (например, m4a) - проверка будет при загрузке
+            info = None
+            
+        if info is not None:
+            if info.duration > MAX_AUDIO_DURATION:
+                return {
+                    'error': f"Запись слишком длинная: {info.duration / 60:.0f} мин",
+                    'recommendations': [f"Разделите запись на части не длиннее {MAX_AUDIO_DURATION // 60} минут."]
+                }
+            if info.samplerate > MAX_SAMPLE_RATE:
+                return {
+                    'error': f"Слишком высокая частота дискретизации: {info.samplerate} Гц",
+                    'recommendations': [f"Передискретизируйте запись до {MAX_SAMPLE_RATE} Гц или ниже."]
+                }
+        
         # Загружаем аудио
-        audio, sample_rate = librosa.load(audio_path, sr=None)
+        audio, sample_rate = _load_audio(audio_path)
         
         # Анализируем и улучшаем аудио
         enhanced_audio, analysis_results = analyze_and_enhance_audio(audio, sample_rate)
@@ -355,3 +484,26 @@ def get_audio_quality_report(audio_path):
             'error': str(e),
             'recommendations': ["Не удалось проанализировать аудио файл. Проверьте формат и доступность файла."]
         }
+
+def _init_batch_worker():
+    """
+    Ограничивает BLAS/OpenMP одним потоком в процессе-обработчике пакета,
+    чтобы процессы не конкурировали за ядра между собой.
+    """
+    threadpool_limits(limits=1)
+
+def process_batch(audio_paths, func=get_audio_quality_report, workers=None):
+    """
+    Обрабатывает несколько аудио файлов параллельно в отдельных процессах.
+    
+    Args:
+        audio_paths (list): Список путей к аудио файлам
+        func (callable): Функция уровня модуля, принимающая путь к файлу
+            (например, get_audio_quality_report или separate_channels)
+        workers (int): Количество процессов (по умолчанию - число ядер)
+        
+    Returns:
+        list: Результаты func для каждого файла в порядке входного списка
+    """
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_batch_worker) as pool:
+        return list(pool.map(func, audio_paths))
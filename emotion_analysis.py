@@ -1,9 +1,14 @@
 import numpy as np
-from typing import List, Dict
 import librosa
+import scipy.fft
 import soundfile as sf
 import tempfile
 import os
+import atexit
+import threading
+from collections import Counter
+from functools import lru_cache
+import torch
 from aniemore.recognizers.voice import VoiceRecognizer
 
 # Примечание: В реальной реализации здесь мы бы импортировали Anyamore
@@ -13,14 +18,108 @@ from aniemore.recognizers.voice import VoiceRecognizer
 # Категории эмоций
 КАТЕГОРИИ_ЭМОЦИЙ = ['негативные', 'нейтрально', 'радость']
 
+# Соответствие эмоций aniemore нашим категориям
+_ANIEMORE_EMOTION_MAPPING = {
+    'anger': 'негативные',
+    'disgust': 'негативные',
+    'fear': 'негативные',
+    'happiness': 'радость',
+    'sadness': 'негативные',
+    'surprise': 'нейтрально',
+    'neutral': 'нейтрально'
+}
+
+# Модель загружается один раз на процесс и разделяется всеми анализаторами
+_voice_recognizer = None
+_voice_recognizer_loaded = False
+_voice_recognizer_lock = threading.Lock()
+
+def _get_voice_recognizer():
+    """
+    Возвращает общий для процесса VoiceRecognizer, загружая модель при первом обращении.
+    
+    Returns:
+        VoiceRecognizer: Распознаватель эмоций или None, если модель не удалось загрузить
+    """
+    global _voice_recognizer, _voice_recognizer_loaded
+    
+    if not _voice_recognizer_loaded:
+        with _voice_recognizer_lock:
+            if not _voice_recognizer_loaded:
+                try:
+                    # Инициализируем с явным указанием модели
+                    _voice_recognizer = VoiceRecognizer(model_name="voice-emotion-recognition")
+                    _quantize_model(_voice_recognizer)
+                except Exception as e:
+                    print(f"Ошибка при инициализации VoiceRecognizer: {str(e)}")
+                    _voice_recognizer = None
+                _voice_recognizer_loaded = True
+                
+    return _voice_recognizer
+
+def _quantize_model(voice_recognizer):
+    """
+    Динамически квантует линейные слои модели в int8 для ускорения инференса на CPU.
+    
+    Args:
+        voice_recognizer (VoiceRecognizer): Распознаватель, модель которого квантуется на месте
+    """
+    if str(voice_recognizer.device) != 'cpu':
+        return
+        
+    # aniemore не предоставляет публичного доступа к модели, поэтому используем атрибут _model;
+    # если его нет или модель еще не загружена, явно сообщаем, что ускорения не будет
+    model = getattr(voice_recognizer, '_model', None)
+    if model is None:
+        print("Предупреждение: модель VoiceRecognizer недоступна, квантование пропущено")
+        return
+
+    try:
+        voice_recognizer._model = torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    except Exception as e:
+        print(f"Не удалось квантовать модель, используется исходная: {str(e)}")
+
+def neutral_emotions(audios, sample_rate):
+    """
+    Резервный результат анализа: нейтральная эмоция на каждую секунду каждого сигнала.
+    
+    Args:
+        audios (list): Список аудио сигналов (numpy.ndarray)
+        sample_rate (int): Частота дискретизации
+        
+    Returns:
+        list: Список эмоций для каждого сигнала
+    """
+    return [['нейтрально'] * (len(audio) // sample_rate) for audio in audios]
+
 class EmotionAnalyzer:
     def __init__(self):
-        try:
-            # Инициализируем с явным указанием модели
-            self.voice_recognizer = VoiceRecognizer(model_name="voice-emotion-recognition")
-        except Exception as e:
-            print(f"Ошибка при инициализации VoiceRecognizer: {str(e)}")
-            self.voice_recognizer = None
+        self.voice_recognizer = _get_voice_recognizer()
+        
+        # Временные файлы для передачи аудио в модель переиспользуются между вызовами;
+        # анализатор может использоваться из нескольких потоков, поэтому доступ к ним под блокировкой.
+        # Анализатор живет до конца процесса, поэтому каталог с файлами удаляем явно при выходе
+        self._temp_dir = tempfile.TemporaryDirectory(prefix='emotions_')
+        atexit.register(self._temp_dir.cleanup)
+        self._temp_paths = []
+        self._temp_lock = threading.Lock()
+        
+    def _get_temp_paths(self, count):
+        """
+        Возвращает count путей к временным WAV файлам, создавая недостающие.
+        
+        Args:
+            count (int): Необходимое количество файлов
+            
+        Returns:
+            list: Список путей
+        """
+        while len(self._temp_paths) < count:
+            path = os.path.join(self._temp_dir.name, f"{len(self._temp_paths)}.wav")
+            self._temp_paths.append(path)
+        return self._temp_paths[:count]
         
     def analyze_emotions(self, audio, sample_rate):
         """
@@ -33,29 +132,57 @@ class EmotionAnalyzer:
         Returns:
             list: Список эмоций для каждого сегмента аудио
         """
-        if self.voice_recognizer is None:
-            print("VoiceRecognizer не инициализирован")
-            return ['нейтрально'] * (len(audio) // sample_rate)
+        return self.analyze_emotions_batch([audio], sample_rate)[0]
+        
+    def analyze_emotions_batch(self, audios, sample_rate):
+        """
+        Анализирует эмоции сразу в нескольких аудио сигналах за один вызов модели.
+        При ошибке распознавания возвращает нейтральные эмоции.
+        
+        Args:
+            audios (list): Список аудио сигналов (numpy.ndarray)
+            sample_rate (int): Частота дискретизации
             
+        Returns:
+            list: Список эмоций для каждого сигнала, в порядке входных данных
+        """
         try:
-            # Сохраняем аудио во временный файл
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                sf.write(temp_file.name, audio, sample_rate)
-                
-                # Получаем эмоции из голоса
-                voice_emotions = self.voice_recognizer.recognize(temp_file.name)
-                
-                # Преобразуем эмоции в наши категории
-                emotions = self._map_emotions(voice_emotions)
-                
-                # Удаляем временный файл
-                os.unlink(temp_file.name)
-                
-                return emotions
-                
+            return self.recognize_emotions_batch(audios, sample_rate)
         except Exception as e:
             print(f"Ошибка при анализе эмоций: {str(e)}")
-            return ['нейтрально'] * (len(audio) // sample_rate)
+            return neutral_emotions(audios, sample_rate)
+            
+    def recognize_emotions_batch(self, audios, sample_rate):
+        """
+        Распознает эмоции сразу в нескольких аудио сигналах за один вызов модели.
+        В отличие от analyze_emotions_batch, ошибки не подменяются нейтральными эмоциями,
+        чтобы вызывающий код мог отличить сбой от результата.
+        
+        Args:
+            audios (list): Список аудио сигналов (numpy.ndarray)
+            sample_rate (int): Частота дискретизации
+            
+        Returns:
+            list: Список эмоций для каждого сигнала, в порядке входных данных
+            
+        Raises:
+            RuntimeError: Если VoiceRecognizer не инициализирован
+        """
+        if self.voice_recognizer is None:
+            raise RuntimeError("VoiceRecognizer не инициализирован")
+            
+        with self._temp_lock:
+            # Перезаписываем переиспользуемые временные файлы (recognize принимает только пути)
+            temp_paths = self._get_temp_paths(len(audios))
+            for path, audio in zip(temp_paths, audios):
+                sf.write(path, audio, sample_rate)
+                
+            # Получаем эмоции из голоса одним пакетным вызовом
+            with torch.inference_mode():
+                voice_emotions = self.voice_recognizer.recognize(temp_paths)
+        
+        # Преобразуем эмоции в наши категории
+        return [self._map_emotions(voice_emotions.get(path)) for path in temp_paths]
             
     def _map_emotions(self, emotions):
         """
@@ -70,22 +197,11 @@ class EmotionAnalyzer:
         if not emotions:
             return ['нейтрально']
             
-        # Преобразуем эмоции aniemore в наши категории
-        emotion_mapping = {
-            'anger': 'негативные',
-            'disgust': 'негативные',
-            'fear': 'негативные',
-            'happiness': 'радость',
-            'sadness': 'негативные',
-            'surprise': 'нейтрально',
-            'neutral': 'нейтрально'
-        }
-        
         # Получаем доминирующую эмоцию
         dominant_emotion = max(emotions.items(), key=lambda x: x[1])[0]
         
         # Преобразуем в нашу категорию
-        mapped_emotion = emotion_mapping.get(dominant_emotion, 'нейтрально')
+        mapped_emotion = _ANIEMORE_EMOTION_MAPPING.get(dominant_emotion, 'нейтрально')
         
         return [mapped_emotion]
 
@@ -99,12 +215,7 @@ def get_emotion_statistics(emotions):
     Returns:
         dict: Статистика по эмоциям
     """
-    emotion_counts = {}
-    for emotion in emotions:
-        if emotion in emotion_counts:
-            emotion_counts[emotion] += 1
-        else:
-            emotion_counts[emotion] = 1
+    emotion_counts = Counter(emotions)
     
     total = len(emotions)
     return {emotion: count/total for emotion, count in emotion_counts.items()}
@@ -119,185 +230,178 @@ def get_dominant_emotion(emotions):
     Returns:
         str: Преобладающая эмоция
     """
-    emotion_counts = {}
-    for emotion in emotions:
-        if emotion in emotion_counts:
-            emotion_counts[emotion] += 1
-        else:
-            emotion_counts[emotion] = 1
-    
-    return max(emotion_counts.items(), key=lambda x: x[1])[0]
+    # При равенстве most_common возвращает эмоцию, встретившуюся первой
+    return Counter(emotions).most_common(1)[0][0]
 
-def extract_features(audio, sample_rate):
+@lru_cache(maxsize=8)
+def _mel_basis(sample_rate, n_fft, n_mels=128):
+    """
+    Возвращает матрицу мел-фильтров (с кэшированием для повторных вызовов с теми же параметрами).
+    
+    Args:
+        sample_rate (int): Частота дискретизации
+        n_fft (int): Размер окна FFT
+        n_mels (int): Количество мел-полос
+        
+    Returns:
+        numpy.ndarray: Матрица формы (n_mels, 1 + n_fft // 2)
+    """
+    return librosa.filters.mel(sr=sample_rate, n_fft=n_fft, n_mels=n_mels)
+
+def extract_features(audio, sample_rate, as_arrays=False):
     """
     Извлекает аудио-характеристики для анализа эмоций.
     
     Args:
         audio (numpy.ndarray): Аудио сигнал
         sample_rate (int): Частота дискретизации
+        as_arrays (bool): Вернуть словарь массивов по характеристикам вместо списка словарей
         
     Returns:
-        list: Список словарей с характеристиками
+        list | dict: Список словарей с характеристиками (или словарь массивов при as_arrays=True)
     """
     # Расчет размера окна для сегментов ~1 секунда
     window_size = sample_rate
     hop_length = window_size // 2
     
-    # Разделение аудио на сегменты
+    # Разделение аудио на сегменты (короткий хвост отбрасывается)
     num_segments = max(1, int((len(audio) - window_size) / hop_length) + 1)
-    features = []
+    starts = np.arange(num_segments) * hop_length
+    ends = np.minimum(starts + window_size, len(audio))
+    keep = ends - starts >= window_size // 2
+    starts, ends = starts[keep], ends[keep]
     
-    for i in range(num_segments):
-        start = i * hop_length
-        end = min(start + window_size, len(audio))
-        
-        if end - start < window_size // 2:
-            continue
-            
-        segment = audio[start:end]
-        
-        # Извлечение характеристик
-        feature_dict = {}
-        
-        # Энергия (громкость)
-        feature_dict['energy'] = np.mean(librosa.feature.rms(y=segment))
-        
-        # Частота пересечения нуля
-        feature_dict['zero_crossing_rate'] = np.mean(librosa.feature.zero_crossing_rate(segment))
-        
-        # Спектральный центроид
-        feature_dict['spectral_centroid'] = np.mean(librosa.feature.spectral_centroid(
-            y=segment, 
-            sr=sample_rate,
-            n_fft=min(1024, len(segment))
-        ))
-        
-        # Спектральный спад
-        feature_dict['spectral_rolloff'] = np.mean(librosa.feature.spectral_rolloff(
-            y=segment, 
-            sr=sample_rate,
-            n_fft=min(1024, len(segment))
-        ))
-        
-        # Спектральная полоса пропускания
-        feature_dict['spectral_bandwidth'] = np.mean(librosa.feature.spectral_bandwidth(
-            y=segment,
-            sr=sample_rate,
-            n_fft=min(1024, len(segment))
-        ))
-        
-        # Спектральная плостность
-        feature_dict['spectral_flatness'] = np.mean(librosa.feature.spectral_flatness(
-            y=segment,
-            n_fft=min(1024, len(segment))
-        ))
-        
-        # MFCC (Mel-frequency cepstral coefficients)
-        mfcc = librosa.feature.mfcc(
-            y=segment,
-            sr=sample_rate,
-            n_mfcc=13,
-            n_fft=min(1024, len(segment))
-        )
-        feature_dict['mfcc_mean'] = np.mean(mfcc, axis=1)
-        feature_dict['mfcc_std'] = np.std(mfcc, axis=1)
-        
-        features.append(feature_dict)
+    if len(starts) == 0:
+        return features_to_arrays([]) if as_arrays else []
     
-    return features
+    # Один спектр на всё аудио; все характеристики считаются по кадрам один раз
+    n_fft = min(1024, len(audio))
+    stft_hop = 512
+    S = np.abs(librosa.stft(audio, n_fft=n_fft, hop_length=stft_hop))
+    frame_features = {
+        'energy': librosa.feature.rms(y=audio, hop_length=stft_hop)[0],
+        'zero_crossing_rate': librosa.feature.zero_crossing_rate(audio, hop_length=stft_hop)[0],
+        'spectral_centroid': librosa.feature.spectral_centroid(S=S, sr=sample_rate, n_fft=n_fft)[0],
+        'spectral_rolloff': librosa.feature.spectral_rolloff(S=S, sr=sample_rate, n_fft=n_fft)[0],
+        'spectral_bandwidth': librosa.feature.spectral_bandwidth(S=S, sr=sample_rate, n_fft=n_fft)[0],
+        'spectral_flatness': librosa.feature.spectral_flatness(S=S)[0],
+    }
+    
+    # Кадры STFT, центры которых попадают в сегмент. Сегменты перекрываются, поэтому
+    # индексы кадров всех сегментов выписываются подряд, и каждый сегмент - непрерывная группа
+    frame_starts = -(-starts // stft_hop)
+    lengths = ends // stft_hop + 1 - frame_starts
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    frame_idx = np.repeat(frame_starts - offsets, lengths) + np.arange(lengths.sum())
+    segment_idx = np.repeat(np.arange(len(starts)), lengths)
+    
+    def segment_mean(values):
+        # values - значения по кадрам, уже выписанные подряд по сегментам
+        return np.add.reduceat(values, offsets, axis=-1) / lengths
+    
+    arrays = {name: segment_mean(values[frame_idx]) for name, values in frame_features.items()}
+    
+    # MFCC (Mel-frequency cepstral coefficients): как power_to_db + mfcc по каждому сегменту,
+    # порог top_db=80 отсчитывается от максимума своего сегмента
+    log_mel = 10.0 * np.log10(np.maximum(1e-10, _mel_basis(sample_rate, n_fft) @ (S ** 2)))
+    segment_max = np.maximum.reduceat(np.max(log_mel, axis=0)[frame_idx], offsets)
+    log_mel = np.maximum(log_mel[:, frame_idx], (segment_max - 80.0)[segment_idx])
+    mfcc = scipy.fft.dct(log_mel, axis=0, type=2, norm='ortho')[:13]
+    mfcc_mean = segment_mean(mfcc)
+    arrays['mfcc_mean'] = mfcc_mean.T
+    arrays['mfcc_std'] = np.sqrt(
+        np.add.reduceat((mfcc - mfcc_mean[:, segment_idx]) ** 2, offsets, axis=-1) / lengths
+    ).T
+    
+    if as_arrays:
+        return arrays
+    return [{column: arrays[column][i] for column in _FEATURE_COLUMNS} for i in range(len(starts))]
 
-def map_features_to_emotions(features):
+# Характеристики, которые хранятся по столбцам (массив значений на все сегменты)
+_FEATURE_COLUMNS = ('energy', 'zero_crossing_rate', 'spectral_centroid', 'spectral_rolloff',
+                    'spectral_bandwidth', 'spectral_flatness', 'mfcc_mean', 'mfcc_std')
+
+def features_to_arrays(features):
     """
-    Преобразует аудио-характеристики в эмоции.
+    Преобразует список словарей с характеристиками в словарь массивов (по столбцам).
     
     Args:
         features (list): Список словарей с характеристиками
         
     Returns:
-        list: Список эмоций
+        dict: Словарь {характеристика: numpy.ndarray}, для MFCC - массивы формы (сегменты, 13)
     """
-    emotions = []
+    return {column: np.array([f[column] for f in features]) for column in _FEATURE_COLUMNS}
+
+def map_features_to_emotions(features):
+    """
+    Преобразует аудио-характеристики в эмоции.
     
-    # Вычисляем средние значения для нормализации
-    all_energies = [f['energy'] for f in features]
-    all_zcr = [f['zero_crossing_rate'] for f in features]
-    all_centroids = [f['spectral_centroid'] for f in features]
-    
-    mean_energy = np.mean(all_energies)
-    mean_zcr = np.mean(all_zcr)
-    mean_centroid = np.mean(all_centroids)
-    
-    std_energy = np.std(all_energies)
-    std_zcr = np.std(all_zcr)
-    std_centroid = np.std(all_centroids)
-    
-    for i, feature in enumerate(features):
-        # Получаем характеристики
-        energy = feature['energy']
-        zcr = feature['zero_crossing_rate']
-        centroid = feature['spectral_centroid']
-        rolloff = feature['spectral_rolloff']
-        bandwidth = feature['spectral_bandwidth']
-        flatness = feature['spectral_flatness']
-        mfcc_mean = feature['mfcc_mean']
-        mfcc_std = feature['mfcc_std']
-        
-        # Нормализуем значения относительно среднего
-        norm_energy = (energy - mean_energy) / (std_energy + 1e-6)
-        norm_zcr = (zcr - mean_zcr) / (std_zcr + 1e-6)
-        norm_centroid = (centroid - mean_centroid) / (std_centroid + 1e-6)
-        
-        # Вычисляем дополнительные метрики
-        energy_variance = np.var(mfcc_mean)
-        pitch_stability = np.mean(np.abs(np.diff(mfcc_mean)))
+    Args:
+        features (list | dict): Список словарей с характеристиками или словарь массивов
+            (см. extract_features(..., as_arrays=True))
         
-        # Определяем эмоцию на основе комбинации характеристик
-        negative_score = 0
-        joy_score = 0
-        neutral_score = 0
+    Returns:
+        list: Список эмоций
+    """
+    if not isinstance(features, dict):
+        features = features_to_arrays(features)
         
-        # Оценка негативных эмоций (более строгие критерии)
-        if norm_energy > 1.0:  # Значительно повышенный порог для энергии
-            negative_score += 1.5  # Уменьшенный вес
-        if norm_zcr > 0.8:  # Повышенный порог для ZCR
-            negative_score += 1.5
-        if bandwidth > 4000:  # Повышенный порог для полосы пропускания
-            negative_score += 1
-        if energy_variance > 0.9:  # Повышенный порог для вариации энергии
-            negative_score += 1
-        if pitch_stability > 0.7:  # Повышенный порог для стабильности тона
-            negative_score += 1
-            
+    energy = features['energy']
+    zcr = features['zero_crossing_rate']
+    centroid = features['spectral_centroid']
+    rolloff = features['spectral_rolloff']
+    bandwidth = features['spectral_bandwidth']
+    flatness = features['spectral_flatness']
+    mfcc_mean = features['mfcc_mean']
+    
+    if len(energy) == 0:
+        return []
+    
+    # Нормализуем значения относительно среднего
+    norm_energy = (energy - np.mean(energy)) / (np.std(energy) + 1e-6)
+    norm_zcr = (zcr - np.mean(zcr)) / (np.std(zcr) + 1e-6)
+    norm_centroid = (centroid - np.mean(centroid)) / (np.std(centroid) + 1e-6)
+    
+    # Вычисляем дополнительные метрики
+    energy_variance = np.var(mfcc_mean, axis=1)
+    pitch_stability = np.mean(np.abs(np.diff(mfcc_mean, axis=1)), axis=1)
+    
+    # Оценка негативных эмоций (более строгие критерии)
+    negative_scores = (
+        1.5 * (norm_energy > 1.0)  # Значительно повышенный порог для энергии, уменьшенный вес
+        + 1.5 * (norm_zcr > 0.8)  # Повышенный порог для ZCR
+        + 1.0 * (bandwidth > 4000)  # Повышенный порог для полосы пропускания
+        + 1.0 * (energy_variance > 0.9)  # Повышенный порог для вариации энергии
+        + 1.0 * (pitch_stability > 0.7)  # Повышенный порог для стабильности тона
         # Дополнительные критерии для негативных эмоций
-        if flatness > 0.7:  # Повышенный порог для спектральной плостности
-            negative_score += 0.8
-        if rolloff > 6000:  # Повышенный порог для спектрального спада
-            negative_score += 0.8
-            
-        # Оценка радости (более мягкие критерии)
-        if 0.2 < norm_energy < 0.8:
-            joy_score += 1.2
-        if norm_centroid > 0.3:
-            joy_score += 1.2
-        if rolloff > 4000:
-            joy_score += 1
-        if pitch_stability < 0.3:
-            joy_score += 1
-        if flatness < 0.3:
-            joy_score += 1
-            
-        # Оценка нейтральных эмоций
-        if abs(norm_energy) < 0.3:
-            neutral_score += 1.2
-        if abs(norm_zcr) < 0.3:
-            neutral_score += 1.2
-        if abs(norm_centroid) < 0.3:
-            neutral_score += 1.2
-        if pitch_stability < 0.2:
-            neutral_score += 1
-        if flatness > 0.4:
-            neutral_score += 1
-        
+        + 0.8 * (flatness > 0.7)  # Повышенный порог для спектральной плостности
+        + 0.8 * (rolloff > 6000)  # Повышенный порог для спектрального спада
+    )
+    
+    # Оценка радости (более мягкие критерии)
+    joy_scores = (
+        1.2 * ((norm_energy > 0.2) & (norm_energy < 0.8))
+        + 1.2 * (norm_centroid > 0.3)
+        + 1.0 * (rolloff > 4000)
+        + 1.0 * (pitch_stability < 0.3)
+        + 1.0 * (flatness < 0.3)
+    )
+    
+    # Оценка нейтральных эмоций
+    neutral_scores = (
+        1.2 * (np.abs(norm_energy) < 0.3)
+        + 1.2 * (np.abs(norm_zcr) < 0.3)
+        + 1.2 * (np.abs(norm_centroid) < 0.3)
+        + 1.0 * (pitch_stability < 0.2)
+        + 1.0 * (flatness > 0.4)
+    )
+    
+    # Выбор эмоции зависит от предыдущей, поэтому этот проход последовательный
+    emotions = []
+    for negative_score, joy_score, neutral_score in zip(
+        negative_scores.tolist(), joy_scores.tolist(), neutral_scores.tolist()
+    ):
         # Выбираем эмоцию с наибольшим счетом
         scores = {
             'негативные': negative_score,
@@ -306,7 +410,7 @@ def map_features_to_emotions(features):
         }
         
         # Добавляем небольшой бонус к предыдущей эмоции для сглаживания
-        if i > 0 and emotions[-1] in scores:
+        if emotions:
             scores[emotions[-1]] += 0.3
             
         # Требуем более высокого порога для негативных эмоций
@@ -332,21 +436,31 @@ def smooth_emotions(emotions, window_size=3):
     if len(emotions) <= window_size:
         return emotions
         
-    smoothed = []
-    for i in range(len(emotions)):
-        start = max(0, i - window_size // 2)
-        end = min(len(emotions), i + window_size // 2 + 1)
-        window = emotions[start:end]
-        
-        # Находим наиболее частую эмоцию в окне
-        emotion_counts = {}
-        for emotion in window:
-            if emotion in emotion_counts:
-                emotion_counts[emotion] += 1
-            else:
-                emotion_counts[emotion] = 1
-                
-        most_common = max(emotion_counts.items(), key=lambda x: x[1])[0]
-        smoothed.append(most_common)
+    # Кодируем эмоции целыми числами
+    labels = list(dict.fromkeys(emotions))
+    label_to_code = {label: i for i, label in enumerate(labels)}
+    n = len(emotions)
+    codes = np.fromiter(map(label_to_code.__getitem__, emotions), dtype=np.intp, count=n)
+    
+    # Границы окна для каждой позиции (у краев окно обрезается)
+    positions = np.arange(n)
+    starts = np.maximum(0, positions - window_size // 2)
+    ends = np.minimum(n, positions + window_size // 2 + 1)
+    
+    # Количество каждой эмоции в окне через накопленные суммы
+    one_hot = np.zeros((n + 1, len(labels)), dtype=np.int32)
+    one_hot[positions + 1, codes] = 1
+    cumulative = np.cumsum(one_hot, axis=0)
+    counts = cumulative[ends] - cumulative[starts]
+    
+    # При равенстве побеждает эмоция, которая встречается в окне раньше
+    first_seen = np.full(counts.shape, n)
+    for code in range(len(labels)):
+        occurrences = np.flatnonzero(codes == code)
+        next_idx = np.searchsorted(occurrences, starts)
+        found = next_idx < len(occurrences)
+        first_seen[found, code] = occurrences[next_idx[found]]
+    first_seen[counts < counts.max(axis=1, keepdims=True)] = n
     
-    return smoothed
+    # Находим наиболее частую эмоцию в окне
+    return np.array(labels, dtype=object)[np.argmin(first_seen, axis=1)].tolist()
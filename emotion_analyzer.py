@@ -1,10 +1,31 @@
 import cv2
 import numpy as np
+import threading
 from emotion_recognition import EmotionRecognition
 
+# Модель распознавания загружается один раз на процесс и разделяется всеми анализаторами
+_emotion_recognizer = None
+_emotion_recognizer_lock = threading.Lock()
+
+def _get_emotion_recognizer():
+    """
+    Возвращает общий для процесса EmotionRecognition, создавая его при первом обращении
+    
+    Returns:
+        EmotionRecognition: Модель распознавания эмоций
+    """
+    global _emotion_recognizer
+    
+    if _emotion_recognizer is None:
+        with _emotion_recognizer_lock:
+            if _emotion_recognizer is None:
+                _emotion_recognizer = EmotionRecognition()
+                
+    return _emotion_recognizer
+
 class EmotionAnalyzer:
     def __init__(self):
-        self.emotion_recognizer = EmotionRecognition()
+        self.emotion_recognizer = _get_emotion_recognizer()
         self.emotions = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
         
     def analyze_emotion(self, frame):
@@ -35,18 +56,51 @@ class EmotionAnalyzer:
             print(f"Ошибка при анализе эмоций: {str(e)}")
             return None
             
-    def get_dominant_emotion(self, frame):
+    def analyze_emotion_batch(self, frames):
+        """
+        Анализирует эмоции сразу на нескольких кадрах видео одним вызовом модели
+        
+        Args:
+            frames: Список кадров видео одинакового размера в формате numpy array
+            
+        Returns:
+            list: Список словарей с эмоциями и их вероятностями (None для кадров, которые не удалось обработать)
+        """
+        if not frames:
+            return []
+            
+        try:
+            # Конвертируем кадры в оттенки серого и собираем в один тензор (M, H, W, 1)
+            batch = np.stack([cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames])[..., np.newaxis]
+            
+            # Получаем предсказания эмоций для всех кадров за один проход
+            predictions = np.asarray(self.emotion_recognizer.predict_emotion(batch))
+            if predictions.shape != (len(frames), len(self.emotions)):
+                raise ValueError(f"Неожиданная форма предсказаний: {predictions.shape}")
+                
+            return [
+                {emotion: float(probability) for emotion, probability in zip(self.emotions, row)}
+                for row in predictions
+            ]
+            
+        except Exception as e:
+            print(f"Пакетный анализ недоступен, анализируем кадры по одному: {str(e)}")
+            return [self.analyze_emotion(frame) for frame in frames]
+            
+    def get_dominant_emotion(self, frame=None, results=None):
         """
         Определяет доминирующую эмоцию на кадре
         
         Args:
             frame: Кадр видео в формате numpy array
+            results: Уже полученный результат analyze_emotion (чтобы не запускать модель повторно)
             
         Returns:
             tuple: (эмоция, вероятность)
         """
-        results = self.analyze_emotion(frame)
+        if results is None:
+            results = self.analyze_emotion(frame)
         if results:
             dominant_emotion = max(results.items(), key=lambda x: x[1])
             return dominant_emotion
-        return None 
\ No newline at end of file
+        return None
\ No newline at end of file
@@ -1,13 +1,94 @@
 import cv2
 import time
+import queue
+import threading
 from emotion_analyzer import EmotionAnalyzer
 
-def process_video(video_path):
+# Количество кадров, которые анализируются за один вызов модели
+BATCH_SIZE = 32
+
+# Сколько декодированных кадров может ждать обработки
+FRAME_QUEUE_SIZE = BATCH_SIZE
+
+# Как часто (в секундах) проверять, жив ли поток чтения, пока очередь кадров пуста
+FRAME_WAIT_TIMEOUT = 0.5
+
+def _put_until_stopped(frames_queue, item, stop_event):
+    """
+    Кладет элемент в очередь, пока обработка не остановлена
+    
+    Returns:
+        bool: True, если элемент добавлен
+    """
+    while not stop_event.is_set():
+        try:
+            frames_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _read_frames(cap, frames_queue, stop_event):
+    """
+    Читает кадры видео в фоновом потоке, чтобы декодирование шло параллельно с анализом.
+    После последнего кадра кладет в очередь None, при ошибке чтения - само исключение
+    
+    Args:
+        cap: Открытый cv2.VideoCapture
+        frames_queue: Очередь для прочитанных кадров
+        stop_event: Событие остановки обработки
+    """
+    end_marker = None
+    try:
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            
+            if not ret:
+                break
+                
+            if not _put_until_stopped(frames_queue, frame, stop_event):
+                break
+    except Exception as e:
+        # Ошибку декодирования передаем основному потоку вместо None
+        end_marker = e
+    finally:
+        # Сигнал окончания кладется всегда, иначе основной поток ждал бы его вечно
+        _put_until_stopped(frames_queue, end_marker, stop_event)
+
+def _next_frame(frames_queue, reader):
+    """
+    Берет из очереди следующий кадр, не зависая, если поток чтения завершился аварийно
+    
+    Args:
+        frames_queue: Очередь прочитанных кадров
+        reader: Поток чтения кадров
+        
+    Returns:
+        Кадр или None в конце видео
+        
+    Raises:
+        Exception: Ошибка, возникшая в потоке чтения
+    """
+    while True:
+        try:
+            item = frames_queue.get(timeout=FRAME_WAIT_TIMEOUT)
+        except queue.Empty:
+            if not reader.is_alive() and frames_queue.empty():
+                raise RuntimeError("Поток чтения кадров завершился без сигнала окончания")
+            continue
+            
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+def process_video(video_path, show=False):
     """
     Обрабатывает видеофайл и анализирует эмоции
     
     Args:
         video_path: Путь к видеофайлу
+        show: Показывать ли кадры в окне со скоростью воспроизведения видео.
+              Без отображения кадры обрабатываются так быстро, как декодируются
     """
     # Инициализируем анализатор эмоций
     emotion_analyzer = EmotionAnalyzer()
@@ -19,48 +100,72 @@ def process_video(video_path):
         print("Ошибка при открытии видеофайла")
         return
         
-    # Получаем FPS видео
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    frame_delay = 1/fps
+    if show:
+        # Получаем FPS видео
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_delay = 1/fps
     
-    while True:
-        # Читаем кадр
-        ret, frame = cap.read()
-        
-        if not ret:
-            break
-            
-        # Анализируем эмоции
-        emotion_results = emotion_analyzer.analyze_emotion(frame)
-        
-        if emotion_results:
-            # Получаем доминирующую эмоцию
-            dominant_emotion, probability = emotion_analyzer.get_dominant_emotion(frame)
-            
-            # Выводим результаты
-            print(f"Доминирующая эмоция: {dominant_emotion} (вероятность: {probability:.2f})")
-            
-            # Отображаем результаты на кадре
-            cv2.putText(frame, f"Emotion: {dominant_emotion}", (10, 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            
-        # Показываем кадр
-        cv2.imshow('Video Analysis', frame)
-        
-        # Ждем нажатия клавиши 'q' для выхода
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+    # Запускаем чтение кадров в фоновом потоке
+    frames_queue = queue.Queue(maxsize=FRAME_QUEUE_SIZE)
+    stop_event = threading.Event()
+    reader = threading.Thread(target=_read_frames, args=(cap, frames_queue, stop_event), daemon=True)
+    reader.start()
+    
+    frames = []
+    finished = False
+    
+    try:
+        while not finished:
+            # Берем следующий прочитанный кадр (None - конец видео)
+            frame = _next_frame(frames_queue, reader)
+            finished = frame is None
             
-        # Задержка для соответствия FPS видео
-        time.sleep(frame_delay)
-        
-    # Освобождаем ресурсы
-    cap.release()
-    cv2.destroyAllWindows()
+            if not finished:
+                frames.append(frame)
+                
+            # Накапливаем кадры и анализируем их пачкой
+            if frames and (finished or len(frames) == BATCH_SIZE):
+                batch_results = emotion_analyzer.analyze_emotion_batch(frames)
+                
+                for frame, emotion_results in zip(frames, batch_results):
+                    if emotion_results:
+                        # Получаем доминирующую эмоцию из уже готового результата
+                        dominant_emotion, probability = emotion_analyzer.get_dominant_emotion(results=emotion_results)
+                        
+                        # Выводим результаты
+                        print(f"Доминирующая эмоция: {dominant_emotion} (вероятность: {probability:.2f})")
+                        
+                        # Отображаем результаты на кадре
+                        if show:
+                            cv2.putText(frame, f"Emotion: {dominant_emotion}", (10, 30),
+                                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                        
+                    if not show:
+                        continue
+                        
+                    # Показываем кадр
+                    cv2.imshow('Video Analysis', frame)
+                    
+                    # Ждем нажатия клавиши 'q' для выхода
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        finished = True
+                        break
+                        
+                    # Задержка для соответствия FPS видео
+                    time.sleep(frame_delay)
+                    
+                frames = []
+    finally:
+        # Останавливаем поток чтения и освобождаем ресурсы, в том числе после ошибки
+        stop_event.set()
+        reader.join()
+        cap.release()
+        if show:
+            cv2.destroyAllWindows()
 
 if __name__ == "__main__":
     # Путь к видеофайлу
     video_path = "input_video.mp4"  # Замените на путь к вашему видео
     
-    # Обрабатываем видео
-    process_video(video_path) 
\ No newline at end of file
+    # Обрабатываем видео с отображением кадров
+    process_video(video_path, show=True) 
\ No newline at end of file
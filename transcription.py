@@ -1,21 +1,132 @@
 import numpy as np
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Dict, Union, BinaryIO
 import os
+import io
 from pydub import AudioSegment
 import tempfile
 import logging
 from scipy import signal
-import librosa
+from scipy.io import wavfile
 import wave
-import json
 import requests
-import time
-from audio_enhancement import AudioEnhancer
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from numba import njit
+from audio_enhancement import AudioEnhancer, compress_dynamic_range
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Поддерживаемые форматы файлов для транскрибации
+_SUPPORTED_EXTENSIONS = frozenset({'.mp3', '.wav', '.ogg', '.m4a'})
+
+# Число параллельных запросов к API при пакетной транскрибации
+_UPLOAD_WORKERS = 4
+
+# Частота дискретизации аудио, отправляемого на распознавание
+_TARGET_SAMPLE_RATE = 16000
+
+# Типы отсчетов pydub по ширине отсчета в байтах
+_SAMPLE_TYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+@lru_cache(maxsize=16)
+def _design_bandpass(order: int, low: float, high: float, fs: int) -> np.ndarray:
+    """
+    Рассчитывает полосовой фильтр Баттерворта в форме SOS (с кэшированием)
+    
+    Args:
+        order (int): Порядок фильтра
+        low (float): Нижняя частота среза, Гц
+        high (float): Верхняя частота среза, Гц
+        fs (int): Частота дискретизации
+        
+    Returns:
+        np.ndarray: Коэффициенты фильтра в форме SOS
+    """
+    return signal.butter(order, [low, high], btype='band', fs=fs, output='sos')
+
+@njit(cache=True, fastmath=True, nogil=True)
+def _abs_mean_max(x):
+    """
+    Рассчитывает среднюю и максимальную абсолютную амплитуду за один проход, без временных массивов
+    
+    Args:
+        x (np.ndarray): Одномерный массив отсчетов
+        
+    Returns:
+        Tuple[float, float]: Средняя и максимальная абсолютная амплитуда (0 для пустого массива)
+    """
+    if x.size == 0:
+        return 0.0, 0.0
+    total = 0.0
+    peak = 0.0
+    for i in range(x.size):
+        # Приведение к float до abs: abs(-32768) в int16 переполняется
+        a = abs(float(x[i]))
+        total += a
+        peak = max(peak, a)
+    return total / x.size, peak
+
+def _wav_signal_stats(wav_data: bytes) -> Tuple[float, float]:
+    """
+    Рассчитывает длительность и средний уровень сигнала WAV файла, уже прочитанного в память
+    
+    Args:
+        wav_data (bytes): Содержимое WAV файла
+        
+    Returns:
+        Tuple[float, float]: Длительность в секундах и средняя амплитуда отсчетов
+    """
+    try:
+        with wave.open(io.BytesIO(wav_data)) as wav_file:
+            sample_width = wav_file.getsampwidth()
+            if sample_width in (2, 4):
+                n_frames = wav_file.getnframes()
+                samples = np.frombuffer(wav_file.readframes(n_frames), dtype=_SAMPLE_TYPES[sample_width])
+                return n_frames / wav_file.getframerate(), _abs_mean_max(samples)[0]
+    except wave.Error:
+        pass
+    
+    # Остальные WAV (float, 8 и 24 бит) разбираем через pydub
+    audio = AudioSegment.from_file(io.BytesIO(wav_data), format='wav')
+    return len(audio) / 1000, _abs_mean_max(np.array(audio.get_array_of_samples()))[0]
+
+@njit(cache=True, fastmath=True, nogil=True)
+def _band_pass_preemphasis(x, sos, coef):
+    """
+    Полосовой фильтр (каскад биквадов SOS) и предыскажение y[n] - coef * y[n-1] за один проход.
+    Состояние фильтра хранится в float64, результат - в типе входного сигнала.
+    Ядро отпускает GIL, поэтому потоки transcribe_batch фильтруют файлы параллельно.
+    
+    Args:
+        x (np.ndarray): Сигнал
+        sos (np.ndarray): Коэффициенты фильтра формы (секции, 6)
+        coef (float): Коэффициент предыскажения
+        
+    Returns:
+        np.ndarray: Обработанный сигнал
+    """
+    n_sections = sos.shape[0]
+    state = np.zeros((n_sections, 2))
+    out = np.empty_like(x)
+    prev = 0.0
+    
+    for i in range(x.size):
+        y = float(x[i])
+        # Каскад секций в транспонированной прямой форме II
+        for s in range(n_sections):
+            b0, b1, b2, a1, a2 = sos[s, 0], sos[s, 1], sos[s, 2], sos[s, 4], sos[s, 5]
+            section_out = b0 * y + state[s, 0]
+            state[s, 0] = b1 * y - a1 * section_out + state[s, 1]
+            state[s, 1] = b2 * y - a2 * section_out
+            y = section_out
+        out[i] = y - coef * prev
+        prev = y
+        
+    return out
+
 class Transcriber:
     def __init__(self):
         """
@@ -26,104 +137,94 @@ class Transcriber:
         if not self.api_key:
             logger.warning("YANDEX_API_KEY не найден в переменных окружения")
         self.audio_enhancer = AudioEnhancer()
+        
+        # Постоянная HTTP сессия: соединение с API (TCP + TLS) переиспользуется между запросами
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        self._session.headers.update({"Authorization": f"Api-Key {self.api_key}"})
         logger.info("Распознаватель речи инициализирован")
         
-    def _normalize_audio(self, audio: AudioSegment) -> AudioSegment:
+    def _normalize_audio(self, samples: np.ndarray) -> np.ndarray:
         """
         Нормализация аудио
         
         Args:
-            audio (AudioSegment): Исходное аудио
+            samples (np.ndarray): Отсчеты моно 16 кГц в диапазоне [-1, 1] (float32)
             
         Returns:
-            AudioSegment: Нормализованное аудио
+            np.ndarray: Нормализованное аудио
         """
         try:
             logger.info("Начало нормализации аудио")
             
-            # Проверяем исходные параметры
-            original_duration = len(audio) / 1000
-            original_samples = np.array(audio.get_array_of_samples())
-            original_avg = np.mean(np.abs(original_samples))
-            original_max = np.max(np.abs(original_samples))
-            logger.info(f"Исходные параметры - Длительность: {original_duration:.2f} сек, Средняя амплитуда: {original_avg:.2f}, Максимальная: {original_max}")
+            # Проверяем исходные параметры (только если диагностика попадет в лог)
+            if logger.isEnabledFor(logging.INFO):
+                original_duration = len(samples) / _TARGET_SAMPLE_RATE
+                original_avg, original_max = _abs_mean_max(samples)
+                logger.info(f"Исходные параметры - Длительность: {original_duration:.2f} сек, Средняя амплитуда: {original_avg:.4f}, Максимальная: {original_max:.4f}")
             
-            # Нормализация громкости
-            audio = audio.normalize()
+            # Нормализация громкости: пик на 0.1 дБ ниже максимума, как в AudioSegment.normalize
+            peak = max(samples.max(), -samples.min())
+            if peak > 0:
+                samples *= np.float32(10 ** (-0.1 / 20) / peak)
             
             # Усиление тихих частей
-            audio = audio + 30  # Увеличиваем громкость на 30 дБ
+            samples *= np.float32(10 ** (30 / 20))  # Увеличиваем громкость на 30 дБ
+            np.clip(samples, -1.0, 1.0, out=samples)
             
-            # Применяем компрессор для выравнивания динамического диапазона
-            audio = audio.compress_dynamic_range()
+            # Применяем компрессор для выравнивания динамического диапазона (тот же, что в AudioEnhancer)
+            samples = compress_dynamic_range(samples, _TARGET_SAMPLE_RATE)
             
             # Проверяем параметры после обработки
-            processed_samples = np.array(audio.get_array_of_samples())
-            processed_avg = np.mean(np.abs(processed_samples))
-            processed_max = np.max(np.abs(processed_samples))
-            logger.info(f"После нормализации - Средняя амплитуда: {processed_avg:.2f}, Максимальная: {processed_max}")
+            if logger.isEnabledFor(logging.INFO):
+                processed_avg, processed_max = _abs_mean_max(samples)
+                logger.info(f"После нормализации - Средняя амплитуда: {processed_avg:.4f}, Максимальная: {processed_max:.4f}")
             
             logger.info("Аудио успешно нормализовано")
-            return audio
+            return samples
         except Exception as e:
             logger.error(f"Ошибка при нормализации аудио: {str(e)}")
-            return audio
+            return samples
 
-    def _remove_noise(self, audio: AudioSegment) -> AudioSegment:
+    def _remove_noise(self, samples: np.ndarray, sample_rate: int) -> np.ndarray:
         """
         Удаление шумов из аудио
         
         Args:
-            audio (AudioSegment): Исходное аудио
+            samples (np.ndarray): Отсчеты моно в диапазоне [-1, 1] (float32)
+            sample_rate (int): Частота дискретизации
             
         Returns:
-            AudioSegment: Очищенное аудио
+            np.ndarray: Очищенное аудио
         """
         try:
             logger.info("Начало удаления шумов")
             
-            # Конвертируем в numpy массив для обработки
-            samples = np.array(audio.get_array_of_samples())
-            
-            # Применяем фильтр высоких частот для удаления низкочастотных шумов
-            nyquist = audio.frame_rate / 2
-            high_pass = 400  # Увеличиваем частоту среза для более агрессивного удаления низкочастотных шумов
-            b, a = signal.butter(4, high_pass/nyquist, btype='high')
-            filtered = signal.filtfilt(b, a, samples)
-            
-            # Применяем фильтр низких частот для удаления высокочастотных шумов
-            low_pass = 3000  # Снижаем частоту среза для более агрессивного удаления высокочастотных шумов
-            b, a = signal.butter(4, low_pass/nyquist, btype='low')
-            filtered = signal.filtfilt(b, a, filtered)
-            
-            # Применяем шумоподавление
-            noise_reduced = librosa.effects.preemphasis(filtered)
+            # Полосовой фильтр и предыскажение за один проход, в float32.
+            # Фильтр однонаправленный: фазовый сдвиг не важен для распознавания речи.
+            # Нижняя граница 400 Гц удаляет низкочастотные шумы, верхняя 3000 Гц - высокочастотные
+            sos = _design_bandpass(4, 400, 3000, sample_rate)
+            noise_reduced = _band_pass_preemphasis(samples, sos, 0.97)
             
             # Проверяем параметры после шумоподавления
-            noise_reduced_avg = np.mean(np.abs(noise_reduced))
-            noise_reduced_max = np.max(np.abs(noise_reduced))
-            logger.info(f"После шумоподавления - Средняя амплитуда: {noise_reduced_avg:.2f}, Максимальная: {noise_reduced_max}")
-            
-            # Конвертируем обратно в AudioSegment
-            cleaned_audio = AudioSegment(
-                noise_reduced.tobytes(),
-                frame_rate=audio.frame_rate,
-                sample_width=audio.sample_width,
-                channels=audio.channels
-            )
+            if logger.isEnabledFor(logging.INFO):
+                noise_reduced_avg, noise_reduced_max = _abs_mean_max(noise_reduced)
+                logger.info(f"После шумоподавления - Средняя амплитуда: {noise_reduced_avg:.4f}, Максимальная: {noise_reduced_max:.4f}")
+            
+            np.clip(noise_reduced, -1.0, 1.0, out=noise_reduced)
             
             logger.info("Шумы успешно удалены")
-            return cleaned_audio
+            return noise_reduced
         except Exception as e:
             logger.error(f"Ошибка при удалении шумов: {str(e)}")
-            return audio
+            return samples
         
-    def _convert_to_wav(self, audio_path: str) -> str:
+    def _convert_to_wav(self, audio_path: Union[str, BinaryIO]) -> str:
         """
         Конвертирует аудио файл в формат WAV с предварительной обработкой
         
         Args:
-            audio_path (str): Путь к исходному аудио файлу
+            audio_path (Union[str, BinaryIO]): Путь к исходному аудио файлу или файловый объект
             
         Returns:
             str: Путь к конвертированному WAV файлу
@@ -138,28 +239,33 @@ class Transcriber:
             audio = AudioSegment.from_file(audio_path)
             logger.info(f"Аудио загружено, длительность: {len(audio)/1000:.2f} сек")
             
-            # Предварительная обработка
-            audio = self._normalize_audio(audio)
-            audio = self._remove_noise(audio)
-            
-            # Конвертируем в моно и экспортируем в WAV
+            # Сначала конвертируем в моно 16 кГц, чтобы нормализация и шумоподавление
+            # обрабатывали минимальный объем данных (для уже подготовленного аудио это no-op)
             audio = audio.set_channels(1)  # Конвертируем в моно
-            audio = audio.set_frame_rate(16000)  # Устанавливаем частоту дискретизации
+            audio = audio.set_frame_rate(_TARGET_SAMPLE_RATE)  # Устанавливаем частоту дискретизации
+            if audio.sample_width not in _SAMPLE_TYPES:
+                audio = audio.set_sample_width(2)
+            
+            # Дальше вся обработка идет над одним массивом numpy в float32
+            samples = np.frombuffer(audio.raw_data, dtype=_SAMPLE_TYPES[audio.sample_width])
+            samples = samples.astype(np.float32) / np.float32(audio.max_possible_amplitude)
+            
+            # Предварительная обработка (пустой сигнал обрабатывать незачем)
+            if samples.size > 0:
+                samples = self._normalize_audio(samples)
+                samples = self._remove_noise(samples, _TARGET_SAMPLE_RATE)
+            
+            # Дополнительное усиление (бывший фильтр ffmpeg volume=2.0) с ограничением
+            samples *= np.float32(2.0)
+            np.clip(samples, -1.0, 1.0, out=samples)
             
             # Проверяем параметры перед экспортом
-            final_samples = np.array(audio.get_array_of_samples())
-            final_avg = np.mean(np.abs(final_samples))
-            final_max = np.max(np.abs(final_samples))
-            logger.info(f"Перед экспортом - Средняя амплитуда: {final_avg:.2f}, Максимальная: {final_max}")
-            
-            # Экспортируем с максимальным качеством
-            audio.export(temp_wav.name, format="wav", parameters=[
-                "-ac", "1",  # моно
-                "-ar", "16000",  # частота дискретизации
-                "-acodec", "pcm_s16le",  # кодек
-                "-sample_fmt", "s16",  # формат сэмпла
-                "-af", "volume=2.0"  # дополнительное усиление
-            ])
+            if logger.isEnabledFor(logging.INFO):
+                final_avg, final_max = _abs_mean_max(samples)
+                logger.info(f"Перед экспортом - Средняя амплитуда: {final_avg:.4f}, Максимальная: {final_max:.4f}")
+            
+            # Экспортируем моно PCM 16 бит напрямую, без запуска ffmpeg
+            wavfile.write(temp_wav.name, _TARGET_SAMPLE_RATE, (samples * np.float32(32767)).astype(np.int16))
             
             logger.info(f"Аудио успешно конвертировано в: {temp_wav.name}")
             return temp_wav.name
@@ -167,117 +273,195 @@ class Transcriber:
             logger.error(f"Ошибка при конвертации аудио: {str(e)}")
             return audio_path
         
-    def transcribe_audio(self, audio_path: str) -> Dict:
+    def _prepare_wav(self, audio_path: Union[str, BinaryIO]) -> Tuple[bytes, float, Dict]:
         """
-        Транскрибация аудио файла с помощью Yandex SpeechKit
+        Подготовка аудио к распознаванию: проверки, улучшение, конвертация в WAV и контроль уровня
         
         Args:
-            audio_path (str): Путь к аудио файлу
+            audio_path (Union[str, BinaryIO]): Путь к аудио файлу или файловый объект
+                в памяти (например, BytesIO с атрибутом name, задающим расширение)
             
         Returns:
-            Dict: Результаты транскрибации
+            Tuple[bytes, float, Dict]: Содержимое WAV, длительность в секундах и результат
+                с ошибкой (None, если аудио готово к отправке)
         """
         try:
-            logger.info(f"Начало транскрибации файла: {audio_path}")
-            
-            # Проверяем существование файла
-            if not os.path.exists(audio_path):
-                logger.error(f"Файл не найден: {audio_path}")
-                return {"segments": [], "error": "Файл не найден"}
+            is_path = isinstance(audio_path, str)
+            file_name = audio_path if is_path else getattr(audio_path, 'name', '')
+            logger.info(f"Начало транскрибации файла: {file_name}")
+            
+            if is_path:
+                # Проверяем существование файла
+                if not os.path.exists(audio_path):
+                    logger.error(f"Файл не найден: {audio_path}")
+                    return None, 0.0, {"segments": [], "error": "Файл не найден"}
+                
+                file_size = os.path.getsize(audio_path)
+            else:
+                file_size = audio_path.seek(0, os.SEEK_END)
+                audio_path.seek(0)
             
             # Проверяем размер файла
-            file_size = os.path.getsize(audio_path)
             if file_size == 0:
                 logger.error("Файл пустой")
-                return {"segments": [], "error": "Файл пустой"}
+                return None, 0.0, {"segments": [], "error": "Файл пустой"}
             
             # Проверяем формат файла
-            if not audio_path.lower().endswith(('.mp3', '.wav', '.ogg', '.m4a')):
+            if os.path.splitext(file_name)[1].lower() not in _SUPPORTED_EXTENSIONS:
                 logger.error("Неподдерживаемый формат файла")
-                return {"segments": [], "error": "Неподдерживаемый формат файла"}
+                return None, 0.0, {"segments": [], "error": "Неподдерживаемый формат файла"}
             
             # Улучшаем качество аудио перед транскрибацией
             enhanced_audio_path = self.audio_enhancer.enhance_audio(audio_path)
             logger.info(f"Аудио улучшено и сохранено в: {enhanced_audio_path}")
             
-            # Конвертируем в WAV если нужно
-            if not enhanced_audio_path.endswith('.wav'):
+            # Конвертируем в WAV если нужно (в т.ч. если улучшение не удалось для файлового объекта)
+            if not isinstance(enhanced_audio_path, str) or not enhanced_audio_path.endswith('.wav'):
+                if not is_path:
+                    audio_path.seek(0)
                 wav_path = self._convert_to_wav(enhanced_audio_path)
-                if wav_path != enhanced_audio_path:
+                if wav_path != enhanced_audio_path and enhanced_audio_path is not audio_path:
                     os.unlink(enhanced_audio_path)
                 enhanced_audio_path = wav_path
             
-            # Проверяем наличие API ключа
-            if not self.api_key:
-                logger.error("API ключ не найден")
-                return {"segments": [], "error": "API ключ не найден"}
+            if not isinstance(enhanced_audio_path, str):
+                logger.error("Не удалось подготовить аудио к распознаванию")
+                return None, 0.0, {"segments": [], "error": "Не удалось подготовить аудио"}
+            
+            # Читаем подготовленный файл один раз: эти же байты проверяются и отправляются в API
+            with open(enhanced_audio_path, 'rb') as audio_file:
+                audio_data = audio_file.read()
             
             # Проверяем качество конвертированного аудио
             try:
-                audio = AudioSegment.from_file(enhanced_audio_path)
-                if len(audio) == 0:
+                audio_duration, signal_level = _wav_signal_stats(audio_data)
+                if audio_duration == 0:
                     logger.error("Конвертированный файл пустой")
-                    return {"segments": [], "error": "Конвертированный файл пустой"}
+                    return None, 0.0, {"segments": [], "error": "Конвертированный файл пустой"}
                 
                 # Проверяем уровень сигнала
-                samples = np.array(audio.get_array_of_samples())
-                signal_level = np.mean(np.abs(samples))
                 if signal_level < 100:  # Минимальный порог уровня сигнала
                     logger.error(f"Слишком низкий уровень сигнала: {signal_level}")
-                    return {"segments": [], "error": "Слишком низкий уровень сигнала"}
+                    return None, 0.0, {"segments": [], "error": "Слишком низкий уровень сигнала"}
                 
             except Exception as e:
                 logger.error(f"Ошибка при проверке конвертированного аудио: {str(e)}")
-                return {"segments": [], "error": "Ошибка при проверке аудио"}
-            
-            # Подготавливаем аудио для отправки
-            with open(enhanced_audio_path, 'rb') as audio_file:
-                audio_data = audio_file.read()
-            
-            # Формируем запрос к API
-            url = "https://stt.api.cloud.yandex.net/speech/v1/stt:recognize"
-            headers = {
-                "Authorization": f"Api-Key {self.api_key}",
-                "Content-Type": "audio/x-wav"
-            }
+                return None, 0.0, {"segments": [], "error": "Ошибка при проверке аудио"}
             
-            # Отправляем запрос
-            try:
-                response = requests.post(url, headers=headers, data=audio_data)
-                response.raise_for_status()
-                
-                # Обрабатываем ответ
-                result = response.json()
-                if "result" not in result:
-                    logger.error(f"Неожиданный ответ от API: {result}")
-                    return {"segments": [], "error": "Ошибка распознавания речи"}
-                
-                # Форматируем результат
-                transcript = result["result"]
-                if not transcript.strip():
-                    logger.error("Пустой результат распознавания")
-                    return {"segments": [], "error": "Не удалось распознать речь"}
-                
-                # Разбиваем на сегменты
-                segments = [{"text": transcript, "start": 0, "end": len(audio)/1000}]
-                
-                return {"segments": segments, "error": None}
-                
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Ошибка при отправке запроса к API: {str(e)}")
-                return {"segments": [], "error": "Ошибка при отправке запроса к API"}
+            return audio_data, audio_duration, None
             
         except Exception as e:
             logger.error(f"Ошибка при транскрибации: {str(e)}")
-            return {"segments": [], "error": str(e)}
+            return None, 0.0, {"segments": [], "error": str(e)}
         finally:
             # Очищаем временные файлы
             try:
-                if enhanced_audio_path != audio_path:
+                if enhanced_audio_path is not audio_path:
                     os.unlink(enhanced_audio_path)
             except:
                 pass
     
+    def _post_to_yandex(self, audio_data: bytes, audio_duration: float) -> Dict:
+        """
+        Отправка подготовленного WAV в Yandex SpeechKit
+        
+        Args:
+            audio_data (bytes): Содержимое WAV файла
+            audio_duration (float): Длительность аудио в секундах
+            
+        Returns:
+            Dict: Результаты транскрибации
+        """
+        # Проверяем наличие API ключа
+        if not self.api_key:
+            logger.error("API ключ не найден")
+            return {"segments": [], "error": "API ключ не найден"}
+        
+        # Формируем запрос к API (заголовок авторизации задан в сессии)
+        url = "https://stt.api.cloud.yandex.net/speech/v1/stt:recognize"
+        headers = {
+            "Content-Type": "audio/x-wav"
+        }
+        
+        # Отправляем запрос
+        try:
+            response = self._session.post(url, headers=headers, data=audio_data)
+            response.raise_for_status()
+            
+            # Обрабатываем ответ
+            result = response.json()
+            if "result" not in result:
+                logger.error(f"Неожиданный ответ от API: {result}")
+                return {"segments": [], "error": "Ошибка распознавания речи"}
+            
+            # Форматируем результат
+            transcript = result["result"]
+            if not transcript.strip():
+                logger.error("Пустой результат распознавания")
+                return {"segments": [], "error": "Не удалось распознать речь"}
+            
+            # Разбиваем на сегменты
+            segments = [{"text": transcript, "start": 0, "end": audio_duration}]
+            
+            return {"segments": segments, "error": None}
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Ошибка при отправке запроса к API: {str(e)}")
+            return {"segments": [], "error": "Ошибка при отправке запроса к API"}
+        except Exception as e:
+            logger.error(f"Ошибка при транскрибации: {str(e)}")
+            return {"segments": [], "error": str(e)}
+        
+    def transcribe_audio(self, audio_path: Union[str, BinaryIO]) -> Dict:
+        """
+        Транскрибация аудио файла с помощью Yandex SpeechKit
+        
+        Args:
+            audio_path (Union[str, BinaryIO]): Путь к аудио файлу или файловый объект
+                в памяти (например, BytesIO с атрибутом name, задающим расширение)
+            
+        Returns:
+            Dict: Результаты транскрибации
+        """
+        audio_data, audio_duration, error = self._prepare_wav(audio_path)
+        if error is not None:
+            return error
+        return self._post_to_yandex(audio_data, audio_duration)
+    
+    def transcribe_batch(self, audio_paths: List[Union[str, BinaryIO]], workers: int = None) -> List[Dict]:
+        """
+        Транскрибация нескольких файлов: подготовка аудио (CPU) и запросы к API (сеть)
+        выполняются в разных пулах потоков и перекрываются во времени
+        
+        Args:
+            audio_paths (List[Union[str, BinaryIO]]): Пути к аудио файлам или файловые объекты
+            workers (int): Число потоков подготовки аудио (по умолчанию - число ядер)
+            
+        Returns:
+            List[Dict]: Результаты транскрибации в порядке входных файлов
+        """
+        results = [None] * len(audio_paths)
+        if not audio_paths:
+            return results
+        
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as prepare_pool, \
+             ThreadPoolExecutor(max_workers=_UPLOAD_WORKERS) as upload_pool:
+            prepared = {prepare_pool.submit(self._prepare_wav, path): i for i, path in enumerate(audio_paths)}
+            
+            # Готовый файл сразу уходит в API, пока остальные еще подготавливаются
+            uploads = {}
+            for future in as_completed(prepared):
+                audio_data, audio_duration, error = future.result()
+                if error is not None:
+                    results[prepared[future]] = error
+                else:
+                    uploads[upload_pool.submit(self._post_to_yandex, audio_data, audio_duration)] = prepared[future]
+            
+            for future, i in uploads.items():
+                results[i] = future.result()
+        
+        return results
+    
     def separate_speakers(self, segments: List[Dict], operator_audio: np.ndarray, 
                          customer_audio: np.ndarray, sample_rate: int) -> Tuple[List[Dict], List[Dict]]:
         """
@@ -307,24 +491,17 @@ class Transcriber:
             sentences = [s.strip() for s in segment["text"].split(".") if s.strip()]
             logger.info(f"Разделено на {len(sentences)} предложений")
             
-            for i, sentence in enumerate(sentences):
-                if not sentence:
-                    continue
-                    
-                # Создаем новый сегмент
-                new_segment = {
-                    "start": segment.get("start", 0),
-                    "end": segment.get("end", 0),
-                    "text": sentence + "."
-                }
-                
-                # Чередуем оператора и клиента
-                if i % 2 == 0:
-                    new_segment["speaker"] = "Оператор"
-                    operator_segments.append(new_segment)
-                else:
-                    new_segment["speaker"] = "Клиент"
-                    customer_segments.append(new_segment)
+            # Чередуем оператора и клиента: четные предложения - оператор, нечетные - клиент
+            start = segment.get("start", 0)
+            end = segment.get("end", 0)
+            operator_segments.extend(
+                {"start": start, "end": end, "text": sentence + ".", "speaker": "Оператор"}
+                for sentence in sentences[0::2]
+            )
+            customer_segments.extend(
+                {"start": start, "end": end, "text": sentence + ".", "speaker": "Клиент"}
+                for sentence in sentences[1::2]
+            )
         
         logger.info(f"Разделено на {len(operator_segments)} сегментов оператора и {len(customer_segments)} сегментов клиента")
         return operator_segments, customer_segments
@@ -343,13 +520,11 @@ class Transcriber:
             logger.warning("Нет сегментов для форматирования")
             return "Транскрибация недоступна"
             
-        formatted_text = ""
-        for segment in segments:
-            if not isinstance(segment, dict) or "speaker" not in segment or "text" not in segment:
-                continue
-            speaker = segment["speaker"]
-            text = segment["text"]
-            formatted_text += f"{speaker}: {text}\n"
+        formatted_text = "".join(
+            f"{segment['speaker']}: {segment['text']}\n"
+            for segment in segments
+            if isinstance(segment, dict) and "speaker" in segment and "text" in segment
+        )
         
         logger.info(f"Отформатирован текст длиной {len(formatted_text)} символов")
         return formatted_text 
\ No newline at end of file
@@ -1,7 +1,55 @@
 import pandas as pd
 from typing import List, Dict, Any
+from collections import Counter
 import numpy as np
 
+# Целочисленные коды эмоций для быстрых вычислений
+EMOTION_CODES = {
+    'негативные': 0,
+    'нейтрально': 1,
+    'радость': 2
+}
+
+_NEGATIVE = EMOTION_CODES['негативные']
+_NEUTRAL = EMOTION_CODES['нейтрально']
+_JOY = EMOTION_CODES['радость']
+
+def encode_emotions(emotions: List[str]) -> np.ndarray:
+    """
+    Преобразует список эмоций в массив целочисленных кодов (неизвестные эмоции получают код -1).
+    
+    Аргументы:
+        emotions (List[str]): Список эмоций
+        
+    Возвращает:
+        np.ndarray: Массив кодов эмоций (int8)
+    """
+    # Коды совпадают с позициями категорий, поэтому сопоставление строк выполняет pandas;
+    # для категориальной колонки с теми же категориями коды берутся готовыми
+    return pd.Categorical(emotions, categories=list(EMOTION_CODES)).codes.astype(np.int8, copy=False)
+
+def _count_runs(mask: np.ndarray, min_length: int = 2) -> int:
+    """
+    Подсчитывает серии значений True длиной не менее min_length.
+    
+    Аргументы:
+        mask (np.ndarray): Булев массив
+        min_length (int): Минимальная длина серии
+        
+    Возвращает:
+        int: Количество серий
+    """
+    if not mask.any():
+        return 0
+    
+    # Границы серий: +1 в начале серии, -1 сразу после ее окончания
+    padded = np.concatenate(([False], mask, [False]))
+    boundaries = np.diff(padded.astype(np.int8))
+    starts = np.flatnonzero(boundaries == 1)
+    ends = np.flatnonzero(boundaries == -1)
+    
+    return int(np.count_nonzero(ends - starts >= min_length))
+
 def count_emotion_sequences(emotions: List[str], target_emotions: List[str], min_length: int = 2) -> int:
     """
     Подсчитывает последовательности целевых эмоций длиной не менее min_length.
@@ -14,22 +62,7 @@ def count_emotion_sequences(emotions: List[str], target_emotions: List[str], min
     Возвращает:
         int: Количество последовательностей
     """
-    count = 0
-    current_streak = 0
-    
-    for emotion in emotions:
-        if emotion in target_emotions:
-            current_streak += 1
-        else:
-            if current_streak >= min_length:
-                count += 1
-            current_streak = 0
-    
-    # Проверка, закончились ли мы последовательностью
-    if current_streak >= min_length:
-        count += 1
-    
-    return count
+    return _count_runs(np.isin(np.asarray(emotions, dtype=object), target_emotions), min_length)
 
 def get_predominant_emotion(emotions: List[str]) -> str:
     """
@@ -41,13 +74,8 @@ def get_predominant_emotion(emotions: List[str]) -> str:
     Возвращает:
         str: Наиболее частая эмоция
     """
-    emotion_counts = {}
-    for emotion in emotions:
-        if emotion not in emotion_counts:
-            emotion_counts[emotion] = 0
-        emotion_counts[emotion] += 1
-    
-    return max(emotion_counts.items(), key=lambda x: x[1])[0]
+    # При равенстве частот выбирается эмоция, встретившаяся первой
+    return Counter(emotions).most_common(1)[0][0]
 
 def calculate_call_quality(df: pd.DataFrame) -> float:
     """
@@ -62,9 +90,17 @@ def calculate_call_quality(df: pd.DataFrame) -> float:
     # Инициализация базовой оценки
     score = 5.0
     
+    # Колонки эмоций кодируются один раз (int8) и дальше сравниваются как числа
+    operator = encode_emotions(df['Эмоция оператора'])
+    customer = encode_emotions(df['Эмоция клиента'])
+    
+    # Маски эмоций считаются один раз и переиспользуются всеми проверками ниже
+    operator_is_negative = operator == _NEGATIVE
+    customer_is_negative = customer == _NEGATIVE
+    
     # Штрафы за негативные эмоции
-    operator_negative = count_emotion_sequences(df['Эмоция оператора'], ['негативные'])
-    customer_negative = count_emotion_sequences(df['Эмоция клиента'], ['негативные'])
+    operator_negative = _count_runs(operator_is_negative)
+    customer_negative = _count_runs(customer_is_negative)
     
     # Штраф за чрезмерные негативные эмоции оператора
     score -= min(2.0, operator_negative * 0.3)
@@ -73,8 +109,8 @@ def calculate_call_quality(df: pd.DataFrame) -> float:
     score -= min(1.0, customer_negative * 0.1)
     
     # Бонусы за позитивные эмоции
-    operator_positive = count_emotion_sequences(df['Эмоция оператора'], ['радость'])
-    customer_positive = count_emotion_sequences(df['Эмоция клиента'], ['радость'])
+    operator_positive = _count_runs(operator == _JOY)
+    customer_positive = _count_runs(customer == _JOY)
     
     # Награда за позитивные эмоции оператора
     score += min(1.0, operator_positive * 0.2)
@@ -83,37 +119,27 @@ def calculate_call_quality(df: pd.DataFrame) -> float:
     score += min(2.0, customer_positive * 0.4)
     
     # Анализ соответствия эмоций
-    emotion_match_rate = (df['Эмоция оператора'] == df['Эмоция клиента']).mean()
+    emotion_match = operator == customer
     
-    # Награда за высокое соответствие эмоций с нейтральными или позитивными эмоциями
-    positive_match = 0
-    for i in range(len(df)):
-        if df['Эмоция оператора'][i] == df['Эмоция клиента'][i] and \
-           df['Эмоция оператора'][i] in ['нейтрально', 'радость']:
-            positive_match += 1
+    # Совпадения нейтральных/позитивных эмоций
+    positive_match = int(np.count_nonzero(emotion_match & ((operator == _NEUTRAL) | (operator == _JOY))))
+    
+    # Отражения оператором негатива клиента из предыдущего сегмента
+    negative_mirror = int(np.count_nonzero(customer_is_negative[:-1] & operator_is_negative[1:]))
     
+    # Награда за высокое соответствие эмоций с нейтральными или позитивными эмоциями
     positive_match_rate = positive_match / len(df) if len(df) > 0 else 0
     score += min(2.0, positive_match_rate * 3.0)
     
     # Проверка на отражение оператором негативных эмоций
-    negative_mirror = 0
-    for i in range(1, len(df)):
-        if df['Эмоция клиента'][i-1] == 'негативные' and \
-           df['Эмоция оператора'][i] == 'негативные':
-            negative_mirror += 1
-    
     # Штраф за отражение негативных эмоций
     score -= min(1.0, negative_mirror * 0.3)
     
     # Проверка на восстановление - клиент начинает негативно, заканчивает позитивно
     if len(df) > 10:
-        start_segment = df.iloc[:len(df)//3]
-        end_segment = df.iloc[-len(df)//3:]
-        
-        start_customer_negative = sum(1 for e in start_segment['Эмоция клиента'] 
-                                     if e == 'негативные') / len(start_segment)
-        end_customer_positive = sum(1 for e in end_segment['Эмоция клиента'] 
-                                   if e in ['радость', 'нейтрально']) / len(end_segment)
+        start_customer_negative = np.count_nonzero(customer_is_negative[:len(df)//3]) / (len(df)//3)
+        end_segment = customer[-len(df)//3:]
+        end_customer_positive = np.count_nonzero((end_segment == _JOY) | (end_segment == _NEUTRAL)) / len(end_segment)
         
         # Награда за превращение негативного разговора в позитивный
         if start_customer_negative > 0.3 and end_customer_positive > 0.7:
@@ -136,31 +162,26 @@ def extract_key_moments(df: pd.DataFrame) -> Dict[str, Any]:
     """
     key_moments = {}
     
+    times = df['Время'].to_numpy()
+    operator = encode_emotions(df['Эмоция оператора'])
+    customer = encode_emotions(df['Эмоция клиента'])
+    customer_negative = customer == _NEGATIVE
+    customer_calm = (customer == _NEUTRAL) | (customer == _JOY)
+    operator_calm = (operator == _NEUTRAL) | (operator == _JOY)
+    
     # Определение моментов, когда клиент становится негативным
-    negative_points = []
-    for i in range(1, len(df)):
-        if df['Эмоция клиента'][i] == 'негативные' and df['Эмоция клиента'][i-1] != 'негативные':
-            negative_points.append(df['Время'][i])
+    negative_points = times[1:][customer_negative[1:] & ~customer_negative[:-1]]
     
-    key_moments['негатив_клиента'] = negative_points
+    key_moments['негатив_клиента'] = negative_points.tolist()
     
     # Определение моментов, когда оператор не адаптируется
-    bad_response_points = []
-    for i in range(1, len(df)):
-        if df['Эмоция клиента'][i-1] == 'негативные' and \
-           df['Эмоция оператора'][i] not in ['нейтрально', 'радость']:
-            bad_response_points.append(df['Время'][i])
+    bad_response_points = times[1:][customer_negative[:-1] & ~operator_calm[1:]]
     
-    key_moments['плохие_ответы'] = bad_response_points
+    key_moments['плохие_ответы'] = bad_response_points.tolist()
     
     # Определение моментов, когда оператор успешно успокаивает клиента
-    good_responses = []
-    for i in range(2, len(df)):
-        if df['Эмоция клиента'][i-2] == 'негативные' and \
-           df['Эмоция оператора'][i-1] in ['нейтрально', 'радость'] and \
-           df['Эмоция клиента'][i] in ['нейтрально', 'радость']:
-            good_responses.append(df['Время'][i])
-    
-    key_moments['хорошие_ответы'] = good_responses
+    good_responses = times[2:][customer_negative[:-2] & operator_calm[1:-1] & customer_calm[2:]]
+    
+    key_moments['хорошие_ответы'] = good_responses.tolist()
     
     return key_moments
@@ -1,12 +1,16 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import librosa
-import librosa.display
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.colors as mcolors
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+from scipy.signal import stft as sp_stft
 import streamlit as st
-from typing import Tuple, List
+from typing import Tuple, List, Iterator
+from collections import Counter
+from contextlib import contextmanager
+import threading
 import io
-import base64
-import pandas as pd
 
 # Цветовая схема для эмоций
 EMOTION_COLORS = {
@@ -15,8 +19,110 @@ EMOTION_COLORS = {
     'нейтрально': '#BDBDBD'   # Серый
 }
 
+# Цвета эмоций в RGB, разобранные один раз, и индексы эмоций в этой таблице
+_EMOTION_INDEX = {emotion: i for i, emotion in enumerate(EMOTION_COLORS)}
+_EMOTION_RGB = np.array([mcolors.to_rgb(color) for color in EMOTION_COLORS.values()], dtype=np.float32)
+
+# Разрешение PNG изображений графиков
+_PNG_DPI = 80
+
+# Частота дискретизации для спектрограммы: полоса телефонной речи (до 4 кГц)
+# при вертикальном разрешении графика в несколько сотен пикселей
+_SPECTROGRAM_SR = 8000
+
+# Фигуры переиспользуются между вызовами: для каждого типа графика хранится запас свободных
+# фигур, поэтому параллельные вызовы одного типа получают разные фигуры
+_FIGURES = {}
+_FIGURES_LOCK = threading.Lock()
+
+@contextmanager
+def _reused_figure(name: str, figsize: Tuple[float, float]) -> Iterator[Figure]:
+    """
+    Выдает свободную фигуру заданного типа графика в монопольное пользование
+    и возвращает ее в запас после построения. Новая фигура создается, только если
+    все фигуры этого типа заняты. Фигуры создаются без pyplot, поэтому не накапливаются
+    в его реестре.
+    
+    Аргументы:
+        name (str): Тип графика
+        figsize (Tuple[float, float]): Размер фигуры в дюймах
+        
+    Возвращает:
+        Iterator[Figure]: Пустая фигура
+    """
+    with _FIGURES_LOCK:
+        free = _FIGURES.setdefault(name, [])
+        fig = free.pop() if free else None
+    if fig is None:
+        fig = Figure(figsize=figsize)
+    try:
+        yield fig
+    finally:
+        # Освобождаем данные графика, не дожидаясь следующего вызова
+        fig.clear()
+        with _FIGURES_LOCK:
+            free.append(fig)
+
+def _figure_to_png(fig: Figure, dpi: int = _PNG_DPI) -> bytes:
+    """
+    Рендерит фигуру в PNG в памяти.
+    
+    Аргументы:
+        fig (Figure): Фигура matplotlib
+        dpi (int): Разрешение изображения
+        
+    Возвращает:
+        bytes: PNG изображение
+    """
+    buf = io.BytesIO()
+    # Быстрое сжатие zlib: PNG почти не увеличивается, а кодирование в разы быстрее уровня 6 по умолчанию.
+    # Без bbox_inches='tight': поля задаются явно в каждом графике, и фигура рисуется один раз
+    fig.savefig(buf, format='png', dpi=dpi,
+                pil_kwargs={'compress_level': 3, 'optimize': False})
+    return buf.getvalue()
+
+def _block_extrema(y: np.ndarray, n_blocks: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Делит сигнал на блоки равной длины и находит минимум и максимум каждого блока.
+    
+    Аргументы:
+        y (np.ndarray): Аудио сигнал
+        n_blocks (int): Желаемое число блоков
+        
+    Возвращает:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Начала блоков (в отсчетах), минимумы и максимумы
+    """
+    starts = np.arange(0, len(y), max(1, len(y) // n_blocks))
+    return starts, np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)
+
+def _minmax_envelope(y: np.ndarray, sr: int, n_blocks: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Прореживает сигнал для линейного графика: для каждого блока отсчетов оставляет
+    минимум и максимум, поэтому огибающая на изображении не меняется.
+    
+    Аргументы:
+        y (np.ndarray): Аудио сигнал
+        sr (int): Частота дискретизации
+        n_blocks (int): Желаемое число блоков (по два отсчета на блок)
+        
+    Возвращает:
+        Tuple[np.ndarray, np.ndarray]: Время (секунды) и значения точек графика
+    """
+    block = len(y) // n_blocks
+    if block < 2:
+        return np.linspace(0, len(y)/sr, len(y)), y
+    
+    starts, mins, maxs = _block_extrema(y, n_blocks)
+    values = np.empty(2 * len(starts), dtype=y.dtype)
+    values[0::2] = mins
+    values[1::2] = maxs
+    times = np.repeat(starts / sr, 2)
+    times[1::2] += (block - 1) / sr
+    return times, values
+
+@st.cache_data(show_spinner=False)
 def create_emotion_timeline(timestamps: List[float], operator_emotions: List[str], 
-                           customer_emotions: List[str]) -> str:
+                           customer_emotions: List[str]) -> bytes:
     """
     Создает визуализацию временной шкалы эмоций для оператора и клиента.
     
@@ -26,67 +132,56 @@ def create_emotion_timeline(timestamps: List[float], operator_emotions: List[str
         customer_emotions (List[str]): Список эмоций клиента
         
     Возвращает:
-        str: Base64 строка с изображением графика
+        bytes: PNG изображение графика
     """
     try:
-        # Создание DataFrame для построения графика
-        df = pd.DataFrame({
-            'Время': timestamps,
-            'Оператор': operator_emotions,
-            'Клиент': customer_emotions
-        })
-        
-        # Создание фигуры
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 6), height_ratios=[1, 1])
-        
-        # Функция для построения графика эмоций
-        def plot_emotions(ax, emotions, title):
-            # Создаем цветовую карту для эмоций
-            colors = [EMOTION_COLORS[emotion] for emotion in emotions]
+        # Создаем фигуру (переиспользуется между вызовами, без pyplot)
+        with _reused_figure('timeline', (12, 6)) as fig:
+            ax1, ax2 = fig.subplots(2, 1, height_ratios=[1, 1])
             
-            # Создаем столбчатую диаграмму
-            bars = ax.bar(range(len(emotions)), [1] * len(emotions), color=colors)
+            # Функция для построения графика эмоций
+            def plot_emotions(ax, emotions, title):
+                # Шкала эмоций - одно изображение 1xN (по пикселю на отсчет) вместо N столбцов
+                if len(emotions):
+                    idx = np.fromiter((_EMOTION_INDEX[emotion] for emotion in emotions),
+                                      dtype=np.intp, count=len(emotions))
+                    ax.imshow(_EMOTION_RGB[idx][np.newaxis], aspect='auto', interpolation='nearest',
+                              extent=(-0.5, len(emotions) - 0.5, 0, 1))
+                
+                # Настройка графика
+                ax.set_title(title, fontsize=12, pad=10)
+                ax.set_xlabel('Время (секунды)', fontsize=10)
+                step = max(1, len(emotions)//10)
+                ticks = range(0, len(emotions), step)
+                ax.set_xticks(ticks)
+                ax.set_xticklabels([f'{t:.1f}' for t in timestamps[::step]])
+                ax.set_yticks([])
+                ax.grid(True, alpha=0.3)
+                
+                # Добавляем подписи только для каждого 10-го отсчета
+                for i in ticks:
+                    ax.text(i, 0.5, emotions[i], ha='center', va='center', color='black', fontsize=8)
             
-            # Настройка графика
-            ax.set_title(title, fontsize=12, pad=10)
-            ax.set_xlabel('Время (секунды)', fontsize=10)
-            ax.set_xticks(range(0, len(emotions), max(1, len(emotions)//10)))
-            ax.set_xticklabels([f'{t:.1f}' for t in timestamps[::max(1, len(emotions)//10)]])
-            ax.set_yticks([])
-            ax.grid(True, alpha=0.3)
+            # Построение графиков для оператора и клиента
+            plot_emotions(ax1, operator_emotions, 'Эмоции оператора')
+            plot_emotions(ax2, customer_emotions, 'Эмоции клиента')
             
-            # Добавляем подписи к столбцам
-            for i, emotion in enumerate(emotions):
-                if i % max(1, len(emotions)//10) == 0:  # Добавляем подписи только для каждого 10-го столбца
-                    ax.text(i, 0.5, emotion, ha='center', va='center', color='black', fontsize=8)
-        
-        # Построение графиков для оператора и клиента
-        plot_emotions(ax1, df['Оператор'], 'Эмоции оператора')
-        plot_emotions(ax2, df['Клиент'], 'Эмоции клиента')
-        
-        # Добавление легенды
-        legend_elements = [plt.Rectangle((0,0),1,1, facecolor=color, label=emotion.capitalize())
-                          for emotion, color in EMOTION_COLORS.items()]
-        fig.legend(handles=legend_elements, loc='upper right', bbox_to_anchor=(1.15, 1))
-        
-        # Настройка общего вида
-        plt.tight_layout()
-        
-        # Сохраняем график в буфер
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # Конвертируем в base64
-        buf.seek(0)
-        img_str = base64.b64encode(buf.read()).decode()
-        
-        return img_str
+            # Добавление легенды
+            legend_elements = [Rectangle((0,0),1,1, facecolor=color, label=emotion.capitalize())
+                              for emotion, color in EMOTION_COLORS.items()]
+            fig.legend(handles=legend_elements, loc='upper right')
+            
+            # Настройка общего вида: справа оставляем место под легенду
+            fig.subplots_adjust(left=0.04, right=0.86, top=0.94, bottom=0.08, hspace=0.35)
+            
+            # Рендерим график в PNG
+            return _figure_to_png(fig)
     except Exception as e:
         st.error(f"Ошибка при создании графика: {str(e)}")
-        return ""
+        return b""
 
-def create_emotion_distribution(emotions: List[str]) -> str:
+@st.cache_data(show_spinner=False)
+def create_emotion_distribution(emotions: List[str]) -> bytes:
     """
     Создает круговую диаграмму, показывающую распределение эмоций.
     
@@ -94,15 +189,11 @@ def create_emotion_distribution(emotions: List[str]) -> str:
         emotions (List[str]): Список эмоций
         
     Возвращает:
-        str: Base64 строка с изображением графика
+        bytes: PNG изображение графика
     """
     try:
         # Подсчет вхождений каждой эмоции
-        emotion_counts = {}
-        for emotion in emotions:
-            if emotion not in emotion_counts:
-                emotion_counts[emotion] = 0
-            emotion_counts[emotion] += 1
+        emotion_counts = Counter(emotions)
         
         # Создание списков для круговой диаграммы
         labels = []
@@ -117,109 +208,149 @@ def create_emotion_distribution(emotions: List[str]) -> str:
                 colors.append(EMOTION_COLORS[emotion])
         
         # Создание круговой диаграммы
-        fig, ax = plt.subplots(figsize=(6, 6))
-        ax.pie(values, labels=labels, colors=colors, autopct='%1.1f%%', startangle=140)
-        ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-        
-        # Настройка графика
-        ax.set_title('Распределение эмоций', fontsize=14, pad=20)
-        
-        # Сохраняем график в буфер
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # Конвертируем в base64
-        buf.seek(0)
-        img_str = base64.b64encode(buf.read()).decode()
-        
-        return img_str
+        # Создаем фигуру (переиспользуется между вызовами, без pyplot)
+        with _reused_figure('distribution', (6, 6)) as fig:
+            ax = fig.subplots()
+            ax.pie(values, labels=labels, colors=colors, autopct='%1.1f%%', startangle=140)
+            ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
+            
+            # Настройка графика
+            ax.set_title('Распределение эмоций', fontsize=14, pad=20)
+            fig.subplots_adjust(left=0.2, right=0.8, top=0.88, bottom=0.05)
+            
+            # Рендерим график в PNG
+            return _figure_to_png(fig)
     except Exception as e:
         st.error(f"Ошибка при создании графика: {str(e)}")
-        return ""
+        return b""
 
-def plot_waveform(audio_path: str) -> str:
+def _spectrogram_db(y: np.ndarray, sr: int, n_fft: int = 1024, hop_length: int = 256,
+                    block_frames: int = 512) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Создает волновой график аудио файла
+    Считает амплитудную спектрограмму в дБ относительно максимума (с порогом 80 дБ).
+    Длинные записи обрабатываются блоками кадров, поэтому в памяти одновременно
+    находятся только итоговая матрица амплитуд и STFT одного блока.
+    
+    Аргументы:
+        y (np.ndarray): Моно аудио сигнал
+        sr (int): Частота дискретизации
+        n_fft (int): Длина окна БПФ
+        hop_length (int): Шаг между кадрами
+        block_frames (int): Число кадров в блоке
+        
+    Возвращает:
+        Tuple[np.ndarray, np.ndarray]: Время центров кадров (секунды) и спектрограмма в дБ
+    """
+    # Запись короче окна дополняем нулями до одного полного кадра
+    if len(y) < n_fft:
+        y = np.pad(y, (0, n_fft - len(y)))
+    n_frames = 1 + (len(y) - n_fft) // hop_length
+    if n_frames <= block_frames:
+        _, times, Z = sp_stft(y, fs=sr, nperseg=n_fft, noverlap=n_fft - hop_length,
+                              window='hann', padded=False, boundary=None)
+        mag = np.abs(Z)
+    else:
+        mag = np.empty((n_fft // 2 + 1, n_frames), dtype=np.float32)
+        for start in range(0, n_frames, block_frames):
+            stop = min(start + block_frames, n_frames)
+            _, _, Z = sp_stft(y[start * hop_length:(stop - 1) * hop_length + n_fft], fs=sr,
+                              nperseg=n_fft, noverlap=n_fft - hop_length,
+                              window='hann', padded=False, boundary=None)
+            np.abs(Z, out=mag[:, start:stop])
+        times = (n_fft / 2 + hop_length * np.arange(n_frames)) / sr
+    
+    # Переводим в дБ на месте, без промежуточных массивов
+    mag += 1e-10
+    np.log10(mag, out=mag)
+    mag *= 20
+    mag -= mag.max()
+    np.maximum(mag, -80.0, out=mag)
+    return times, mag
+
+def plot_waveform(y: np.ndarray, sr: int) -> bytes:
+    """
+    Создает волновой график аудио
     
     Args:
-        audio_path (str): Путь к аудио файлу
+        y (np.ndarray): Моно аудио сигнал
+        sr (int): Частота дискретизации
         
     Returns:
-        str: Base64 строка с изображением графика
+        bytes: PNG изображение графика
     """
     try:
-        # Загружаем аудио
-        y, sr = librosa.load(audio_path, sr=None)
-        
-        # Создаем фигуру
-        plt.figure(figsize=(12, 4))
-        
-        # Строим волновой график
-        librosa.display.waveshow(y, sr=sr, color='#1f77b4')
-        
-        # Настраиваем внешний вид
-        plt.title('Волновая форма аудио', fontsize=14, pad=20)
-        plt.xlabel('Время (секунды)', fontsize=12)
-        plt.ylabel('Амплитуда', fontsize=12)
-        plt.grid(True, alpha=0.3)
-        
-        # Сохраняем график в буфер
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # Конвертируем в base64
-        buf.seek(0)
-        img_str = base64.b64encode(buf.read()).decode()
-        
-        return img_str
+        # Создаем фигуру (переиспользуется между вызовами, без pyplot)
+        with _reused_figure('waveform', (12, 4)) as fig:
+            ax = fig.subplots()
+            
+            # Строим волновой график как заливку между мин/макс блоков (два блока на пиксель
+            # ширины); на коротких записях, где блоки вырождаются, рисуем сам сигнал
+            starts, mins, maxs = _block_extrema(y, int(fig.get_figwidth() * _PNG_DPI * 2))
+            if len(starts) < len(y):
+                ax.fill_between(starts / sr, mins, maxs, color='#1f77b4', linewidth=0)
+            else:
+                ax.plot(starts / sr, y, color='#1f77b4')
+            ax.set_xlim(0, len(y)/sr)
+            
+            # Настраиваем внешний вид
+            ax.set_title('Волновая форма аудио', fontsize=14, pad=20)
+            ax.set_xlabel('Время (секунды)', fontsize=12)
+            ax.set_ylabel('Амплитуда', fontsize=12)
+            ax.grid(True, alpha=0.3)
+            fig.subplots_adjust(left=0.07, right=0.98, top=0.85, bottom=0.15)
+            
+            # Рендерим график в PNG
+            return _figure_to_png(fig)
     except Exception as e:
         st.error(f"Ошибка при создании графика: {str(e)}")
-        return ""
+        return b""
 
-def plot_spectrogram(audio_path: str) -> str:
+def plot_spectrogram(y: np.ndarray, sr: int) -> bytes:
     """
-    Создает спектрограмму аудио файла
+    Создает спектрограмму аудио
     
     Args:
-        audio_path (str): Путь к аудио файлу
+        y (np.ndarray): Моно аудио сигнал
+        sr (int): Частота дискретизации
         
     Returns:
-        str: Base64 строка с изображением графика
+        bytes: PNG изображение графика
     """
+    # librosa.display тянет за собой свой модуль осей и форматтеров; загружаем его
+    # только при первом построении спектрограммы (импорт заодно связывает имя librosa)
+    import librosa.display
+    
     try:
-        # Загружаем аудио
-        y, sr = librosa.load(audio_path, sr=None)
-        
-        # Создаем фигуру
-        plt.figure(figsize=(12, 4))
-        
-        # Строим спектрограмму
-        D = librosa.amplitude_to_db(np.abs(librosa.stft(y)), ref=np.max)
-        librosa.display.specshow(D, sr=sr, x_axis='time', y_axis='log')
-        
-        # Настраиваем внешний вид
-        plt.colorbar(format='%+2.0f dB')
-        plt.title('Спектрограмма', fontsize=14, pad=20)
-        plt.xlabel('Время (секунды)', fontsize=12)
-        plt.ylabel('Частота (Гц)', fontsize=12)
-        
-        # Сохраняем график в буфер
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # Конвертируем в base64
-        buf.seek(0)
-        img_str = base64.b64encode(buf.read()).decode()
-        
-        return img_str
+        # Создаем фигуру (переиспользуется между вызовами, без pyplot)
+        with _reused_figure('spectrogram', (12, 4)) as fig:
+            ax = fig.subplots()
+            
+            # Спектрограмма только для отображения: float32 достаточно, а float64-сигнал
+            # удвоил бы объем данных при ресэмплинге, STFT и переводе в дБ
+            y = y.astype(np.float32, copy=False)
+            
+            # Строим спектрограмму на пониженной частоте: меньше и короче БПФ
+            if sr > _SPECTROGRAM_SR:
+                y = librosa.resample(y, orig_sr=sr, target_sr=_SPECTROGRAM_SR, res_type='soxr_hq')
+                sr = _SPECTROGRAM_SR
+            times, D = _spectrogram_db(y, sr)
+            img = librosa.display.specshow(D, sr=sr, hop_length=256, x_coords=times,
+                                           x_axis='time', y_axis='log', ax=ax)
+            
+            # Настраиваем внешний вид
+            fig.colorbar(img, ax=ax, format='%+2.0f dB')
+            ax.set_title('Спектрограмма', fontsize=14, pad=20)
+            ax.set_xlabel('Время (секунды)', fontsize=12)
+            ax.set_ylabel('Частота (Гц)', fontsize=12)
+            fig.subplots_adjust(left=0.08, right=1.0, top=0.85, bottom=0.15)
+            
+            # Рендерим график в PNG
+            return _figure_to_png(fig)
     except Exception as e:
         st.error(f"Ошибка при создании спектрограммы: {str(e)}")
-        return ""
+        return b""
 
-def plot_emotions(emotions: List[Tuple[str, float]]) -> str:
+def plot_emotions(emotions: List[Tuple[str, float]]) -> bytes:
     """
     Создает график эмоций
     
@@ -227,53 +358,48 @@ def plot_emotions(emotions: List[Tuple[str, float]]) -> str:
         emotions (List[Tuple[str, float]]): Список эмоций и их значений
         
     Returns:
-        str: Base64 строка с изображением графика
+        bytes: PNG изображение графика
     """
     try:
-        # Создаем фигуру
-        plt.figure(figsize=(10, 6))
-        
-        # Подготавливаем данные
-        labels = [e[0] for e in emotions]
-        values = [e[1] for e in emotions]
-        
-        # Строим столбчатую диаграмму
-        bars = plt.bar(labels, values, color='#1f77b4')
-        
-        # Добавляем значения над столбцами
-        for bar in bars:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{height:.2f}',
-                    ha='center', va='bottom')
-        
-        # Настраиваем внешний вид
-        plt.title('Распределение эмоций', fontsize=14, pad=20)
-        plt.xlabel('Эмоция', fontsize=12)
-        plt.ylabel('Интенсивность', fontsize=12)
-        plt.ylim(0, 1)
-        plt.grid(True, alpha=0.3)
-        
-        # Сохраняем график в буфер
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # Конвертируем в base64
-        buf.seek(0)
-        img_str = base64.b64encode(buf.read()).decode()
-        
-        return img_str
+        # Создаем фигуру (переиспользуется между вызовами, без pyplot)
+        with _reused_figure('emotions', (10, 6)) as fig:
+            ax = fig.subplots()
+            
+            # Подготавливаем данные
+            labels = [e[0] for e in emotions]
+            values = [e[1] for e in emotions]
+            
+            # Строим столбчатую диаграмму
+            bars = ax.bar(labels, values, color='#1f77b4')
+            
+            # Добавляем значения над столбцами
+            for bar in bars:
+                height = bar.get_height()
+                ax.text(bar.get_x() + bar.get_width()/2., height,
+                        f'{height:.2f}',
+                        ha='center', va='bottom')
+            
+            # Настраиваем внешний вид
+            ax.set_title('Распределение эмоций', fontsize=14, pad=20)
+            ax.set_xlabel('Эмоция', fontsize=12)
+            ax.set_ylabel('Интенсивность', fontsize=12)
+            ax.set_ylim(0, 1)
+            ax.grid(True, alpha=0.3)
+            fig.subplots_adjust(left=0.08, right=0.97, top=0.9, bottom=0.1)
+            
+            # Рендерим график в PNG
+            return _figure_to_png(fig)
     except Exception as e:
         st.error(f"Ошибка при создании графика эмоций: {str(e)}")
-        return ""
+        return b""
 
-def create_sample_visualization() -> str:
+@st.cache_data(show_spinner=False)
+def create_sample_visualization() -> bytes:
     """
     Создает пример визуализации для демонстрации.
     
     Returns:
-        str: Base64 строка с изображением графика
+        bytes: PNG изображение графика
     """
     try:
         # Создаем пример данных
@@ -294,47 +420,42 @@ def create_sample_visualization() -> str:
         return create_emotion_timeline(timestamps, operator_emotions, customer_emotions)
     except Exception as e:
         st.error(f"Ошибка при создании примера визуализации: {str(e)}")
-        return ""
+        return b""
 
-def plot_linear_waveform(audio_path: str) -> str:
+def plot_linear_waveform(y: np.ndarray, sr: int) -> bytes:
     """
     Создает линейный график аудио волны
     
     Args:
-        audio_path (str): Путь к аудио файлу
+        y (np.ndarray): Моно аудио сигнал
+        sr (int): Частота дискретизации
         
     Returns:
-        str: Base64 строка с изображением графика
+        bytes: PNG изображение графика
     """
     try:
-        # Загружаем аудио
-        y, sr = librosa.load(audio_path, sr=None)
-        
-        # Создаем фигуру
-        plt.figure(figsize=(12, 4))
-        
-        # Строим линейный график
-        plt.plot(np.linspace(0, len(y)/sr, len(y)), y, color='#1f77b4', linewidth=0.5)
-        
-        # Настраиваем внешний вид
-        plt.title('Линейный график аудио', fontsize=12, pad=20)
-        plt.xlabel('Время (секунды)', fontsize=10)
-        plt.ylabel('Амплитуда', fontsize=10)
-        plt.grid(True, linestyle='--', alpha=0.7)
-        
-        # Устанавливаем пределы осей
-        plt.xlim(0, len(y)/sr)
-        plt.ylim(-1, 1)
-        
-        # Сохраняем в буфер
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-        plt.close()
-        
-        # Конвертируем в base64
-        buf.seek(0)
-        img_str = base64.b64encode(buf.read()).decode()
-        return img_str
+        # Создаем фигуру (переиспользуется между вызовами, без pyplot)
+        with _reused_figure('linear_waveform', (12, 4)) as fig:
+            ax = fig.subplots()
+            
+            # Строим линейный график по мин/макс огибающей (два блока на пиксель ширины):
+            # более подробные данные на изображении все равно неразличимы
+            times, values = _minmax_envelope(y, sr, int(fig.get_figwidth() * _PNG_DPI * 2))
+            ax.plot(times, values, color='#1f77b4', linewidth=0.5)
+            
+            # Настраиваем внешний вид
+            ax.set_title('Линейный график аудио', fontsize=12, pad=20)
+            ax.set_xlabel('Время (секунды)', fontsize=10)
+            ax.set_ylabel('Амплитуда', fontsize=10)
+            ax.grid(True, linestyle='--', alpha=0.7)
+            
+            # Устанавливаем пределы осей
+            ax.set_xlim(0, len(y)/sr)
+            ax.set_ylim(-1, 1)
+            fig.subplots_adjust(left=0.07, right=0.98, top=0.86, bottom=0.14)
+            
+            # Рендерим график в PNG
+            return _figure_to_png(fig)
         
     except Exception as e:
         st.error(f"Ошибка при создании линейного графика: {str(e)}")